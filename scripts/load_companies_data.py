@@ -3,89 +3,186 @@
 Script to load SaaS companies data from CSV into the database
 """
 
+import argparse
 import asyncio
 import csv
 import sys
+import time
+from collections.abc import Iterable, Iterator
+from itertools import islice
 from pathlib import Path
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 
 
 # Add the parent directory to Python path so we can import from src
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from src.pulse.database.models import Company
 from src.pulse.database.session import close_database, get_async_session
-from src.pulse.utils.data_normalization import parse_currency_to_float, parse_employee_count
-
-
-async def load_companies_data():
-    """Load companies data from CSV file into database"""
-    csv_file = project_root / "top_100_saas_companies_2025.csv"
-
-    if not csv_file.exists():
+from src.pulse.services.companies import company_service
+from src.pulse.services.data_versions import data_version_service
+from src.pulse.utils.data_normalization import (
+    parse_currency_column,
+    parse_employee_count_column,
+)
+
+
+DEFAULT_CSV_FILE = project_root / "top_100_saas_companies_2025.csv"
+DEFAULT_BATCH_SIZE = 1000
+
+
+def split_list(value: str) -> list[str]:
+    """Split a comma-separated CSV cell into a list of stripped values"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def normalize_rows(rows: list[dict[str, str]]) -> list[dict[str, Any]]:
+    """Convert a batch of CSV rows into column values for the companies table"""
+    total_funding = parse_currency_column([row["Total Funding"] for row in rows])
+    arr = parse_currency_column([row["ARR"] for row in rows])
+    valuation = parse_currency_column([row["Valuation"] for row in rows])
+    employees = parse_employee_count_column([row["Employees"] for row in rows])
+
+    return [
+        {
+            "company_name": row["Company Name"],
+            "founded_year": int(row["Founded Year"]),
+            "headquarters": row["HQ"],
+            "industry": row["Industry"],
+            "total_funding_usd": total_funding[i],
+            "arr_usd": arr[i],
+            "valuation_usd": valuation[i],
+            "employee_count": employees[i],
+            "top_investors": split_list(row["Top Investors"]),
+            "product": split_list(row["Product"]),
+            "g2_rating": float(row["G2 Rating"]),
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+def iter_batches(rows: Iterable[dict[str, str]], batch_size: int) -> Iterator[list[dict[str, str]]]:
+    """Yield rows in lists of at most batch_size without reading ahead further"""
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+async def load_batch(rows: list[dict[str, Any]], upsert: bool) -> dict[str, int]:
+    """Write one batch of companies and their links in a single transaction"""
+    async with get_async_session() as session:
+        if upsert:
+            counts = await company_service.upsert_companies(session, rows)
+        else:
+            await company_service.insert_companies(session, rows)
+            counts = {"inserted": len(rows), "updated": 0, "unchanged": 0}
+
+        # Bump the data version so cached visualizations are invalidated
+        if counts["inserted"] or counts["updated"]:
+            await data_version_service.bump_version(session, "companies")
+        await session.commit()
+        return counts
+
+
+async def load_companies_data(
+    csv_file: Path = DEFAULT_CSV_FILE, batch_size: int = DEFAULT_BATCH_SIZE, upsert: bool = False
+) -> bool:
+    """Stream companies data from a CSV file into the database in batches
+
+    With upsert, rows are matched on (company name, founded year): unchanged rows are
+    skipped, changed rows updated and new rows inserted, so a refresh can run in place.
+    """
+    if not await asyncio.to_thread(csv_file.exists):
         print(f"❌ CSV file not found: {csv_file}")
         return False
 
-    print(f"📁 Loading companies data from: {csv_file}")
+    mode = "upsert" if upsert else "insert"
+    print(f"📁 Loading companies data from: {csv_file} ({mode}, batch size {batch_size})")
 
     # Initialize database
     from src.pulse.database.session import init_database
 
     await init_database()
 
-    companies_loaded = 0
+    rows_read = 0
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0}
+    started = time.perf_counter()
 
-    async with get_async_session() as session:
-        try:
-            # Read CSV data
-            with open(csv_file, encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-
-                for row in reader:
-                    # Split comma-separated values into arrays
-                    top_investors_list = [
-                        inv.strip() for inv in row["Top Investors"].split(",") if inv.strip()
-                    ]
-                    product_list = [
-                        prod.strip() for prod in row["Product"].split(",") if prod.strip()
-                    ]
-
-                    # Create company instance with normalized values
-                    company = Company(
-                        company_name=row["Company Name"],
-                        founded_year=int(row["Founded Year"]),
-                        headquarters=row["HQ"],
-                        industry=row["Industry"],
-                        total_funding_usd=parse_currency_to_float(row["Total Funding"]),
-                        arr_usd=parse_currency_to_float(row["ARR"]),
-                        valuation_usd=parse_currency_to_float(row["Valuation"]),
-                        employee_count=parse_employee_count(row["Employees"]),
-                        top_investors=top_investors_list,
-                        product=product_list,
-                        g2_rating=float(row["G2 Rating"]),
-                    )
-
-                    session.add(company)
-                    companies_loaded += 1
-
-                # Commit all companies
+    try:
+        with open(csv_file, encoding="utf-8", newline="") as file:
+            reader = csv.DictReader(file)
+
+            for batch in iter_batches(reader, batch_size):
+                counts = await load_batch(normalize_rows(batch), upsert)
+                for key, count in counts.items():
+                    totals[key] += count
+                rows_read += len(batch)
+
+                elapsed = time.perf_counter() - started
+                print(f"   … {rows_read} rows processed ({rows_read / elapsed:,.0f} rows/sec)")
+
+        # Refresh table statistics for the query planner and the SQL cost guard
+        if totals["inserted"] or totals["updated"]:
+            async with get_async_session() as session:
+                await session.execute(text("ANALYZE"))
                 await session.commit()
-                print(f"✅ Successfully loaded {companies_loaded} companies into database")
 
-        except Exception as e:
-            await session.rollback()
-            print(f"❌ Error loading companies data: {e}")
-            return False
+    except IntegrityError:
+        # (company name, founded year) is unique, so a plain insert over loaded data fails
+        print(
+            f"❌ Companies are already in the database (stopped after {rows_read} rows). "
+            "Re-run with --upsert to update existing companies in place."
+        )
+        return False
 
-        finally:
-            await close_database()
+    except Exception as e:
+        print(f"❌ Error loading companies data after {rows_read} rows: {e}")
+        return False
 
+    finally:
+        await close_database()
+
+    elapsed = time.perf_counter() - started
+    rate = rows_read / elapsed if elapsed else 0.0
+    print(
+        f"✅ Processed {rows_read} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec): "
+        f"{totals['inserted']} inserted, {totals['updated']} updated, "
+        f"{totals['unchanged']} unchanged"
+    )
     return True
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Load SaaS companies data from CSV")
+    parser.add_argument(
+        "csv_file", nargs="?", type=Path, default=DEFAULT_CSV_FILE, help="CSV file to load"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Rows per insert transaction (default {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="Update existing companies in place, skipping unchanged rows, instead of "
+        "inserting into an empty database",
+    )
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
 if __name__ == "__main__":
+    args = parse_args()
     print("🚀 Starting companies data loading...")
-    result = asyncio.run(load_companies_data())
+    result = asyncio.run(load_companies_data(args.csv_file, args.batch_size, args.upsert))
     if result:
         print("🎉 Data loading completed successfully!")
     else:
@@ -36,11 +36,13 @@ async def rebuild_database():
     """Rebuild the database from scratch"""
     print("🗑️  Rebuilding database from scratch...")
 
-    # Remove existing database file if it exists
-    db_file = project_root / "pulse.db"
-    if db_file.exists():
-        print(f"🗑️  Removing existing database: {db_file}")
-        db_file.unlink()
+    # Remove the existing database file and its WAL sidecars; a stale -wal next to a
+    # fresh database could be replayed into it
+    for name in ("pulse.db", "pulse.db-wal", "pulse.db-shm"):
+        db_file = project_root / name
+        if db_file.exists():
+            print(f"🗑️  Removing existing database file: {db_file}")
+            db_file.unlink()
 
     # Run Alembic upgrade to create fresh database
     if not run_alembic_command(["alembic", "upgrade", "head"]):
@@ -6,7 +6,7 @@ Generic SQLAlchemy models designed for SQLite with PostgreSQL migration path
 import uuid
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, Float, Integer, String
+from sqlalchemy import BigInteger, DateTime, Float, ForeignKey, Index, Integer, String
 from sqlalchemy.dialects.sqlite import INTEGER
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -21,6 +21,14 @@ class Company(Base):
     """Company model for SaaS companies data"""
 
     __tablename__ = "companies"
+    __table_args__ = (
+        # Industry filter + name ordering used by the companies list endpoint
+        Index("ix_companies_industry_company_name", "industry", "company_name"),
+        # Natural key used by the loader's upsert mode
+        Index(
+            "uq_companies_company_name_founded_year", "company_name", "founded_year", unique=True
+        ),
+    )
 
     id: Mapped[int] = mapped_column(INTEGER, primary_key=True, autoincrement=True)
     uuid: Mapped[str] = mapped_column(
@@ -28,18 +36,18 @@ class Company(Base):
     )
 
     # Company details from CSV
-    company_name: Mapped[str] = mapped_column(String(255), nullable=False)
-    founded_year: Mapped[int] = mapped_column(Integer, nullable=False)
+    company_name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    founded_year: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
     headquarters: Mapped[str] = mapped_column(String(255), nullable=False)
     industry: Mapped[str] = mapped_column(String(255), nullable=False)
 
     # Financial data (normalized to USD values as whole dollars, 0 if unknown)
     total_funding_usd: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)  # In USD
     arr_usd: Mapped[int] = mapped_column(
-        BigInteger, nullable=False, default=0
+        BigInteger, nullable=False, default=0, index=True
     )  # Annual Recurring Revenue in USD
     valuation_usd: Mapped[int] = mapped_column(
-        BigInteger, nullable=False, default=0
+        BigInteger, nullable=False, default=0, index=True
     )  # Valuation in USD
 
     # Employee count (normalized to integer)
@@ -48,7 +56,10 @@ class Company(Base):
     # JSON fields - arrays of strings
     top_investors: Mapped[list[str]] = mapped_column(JSON, nullable=False)
     product: Mapped[list[str]] = mapped_column(JSON, nullable=False)
-    g2_rating: Mapped[float] = mapped_column(Float, nullable=False)
+    g2_rating: Mapped[float] = mapped_column(Float, nullable=False, index=True)
+
+    # SHA-256 of the normalized source row, used to skip unchanged rows on refresh
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
@@ -59,3 +70,70 @@ class Company(Base):
 
     def __repr__(self) -> str:
         return f"<Company(id={self.id}, name='{self.company_name}', industry='{self.industry}')>"
+
+
+class Investor(Base):
+    """Investor referenced by companies.top_investors"""
+
+    __tablename__ = "investors"
+
+    id: Mapped[int] = mapped_column(INTEGER, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Investor(id={self.id}, name='{self.name}')>"
+
+
+class CompanyInvestor(Base):
+    """Link between a company and one of its top investors (mirrors companies.top_investors)"""
+
+    __tablename__ = "company_investors"
+
+    company_id: Mapped[int] = mapped_column(
+        ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True
+    )
+    investor_id: Mapped[int] = mapped_column(
+        ForeignKey("investors.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class Product(Base):
+    """Product referenced by companies.product"""
+
+    __tablename__ = "products"
+
+    id: Mapped[int] = mapped_column(INTEGER, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<Product(id={self.id}, name='{self.name}')>"
+
+
+class CompanyProduct(Base):
+    """Link between a company and one of its products (mirrors companies.product)"""
+
+    __tablename__ = "company_products"
+
+    company_id: Mapped[int] = mapped_column(
+        ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True
+    )
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class DataVersion(Base):
+    """Monotonic per-table version counter, bumped whenever a table's data is reloaded"""
+
+    __tablename__ = "data_versions"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<DataVersion(table='{self.table_name}', version={self.version})>"
@@ -3,11 +3,20 @@ Database session management for Pulse
 Async SQLAlchemy session handling with SQLite
 """
 
+import sqlite3
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import URL, event, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
+from ..metrics import db_session_acquire_duration
 from ..settings import settings
 from .models import Base
 
@@ -16,17 +25,130 @@ from .models import Base
 engine = None
 async_session_factory = None
 
+# Read-only engine for generated analytics SQL, separate from the CRUD pool
+analytics_engine = None
+analytics_session_factory = None
+
+# Authorizer actions allowed on analytics connections; everything else is denied
+_READ_ACTIONS = frozenset(
+    {
+        sqlite3.SQLITE_SELECT,
+        sqlite3.SQLITE_READ,
+        sqlite3.SQLITE_FUNCTION,
+        sqlite3.SQLITE_RECURSIVE,
+        sqlite3.SQLITE_TRANSACTION,  # So pooled connections can always roll back
+    }
+)
+
+
+def _read_only_authorizer(action: int, arg1: str | None, *args: Any) -> int:
+    """SQLite authorizer that only permits reading"""
+    if action in _READ_ACTIONS:
+        return sqlite3.SQLITE_OK
+    # Constructing table-valued functions such as json_each is reported as an update
+    # of sqlite_master; actual schema writes are still refused by mode=ro/query_only
+    if action == sqlite3.SQLITE_UPDATE and arg1 == "sqlite_master":
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+
+def _is_memory(url: URL) -> bool:
+    return not url.database or url.database == ":memory:"
+
+
+def _analytics_url(database_url: str) -> URL:
+    """URL opening the same SQLite file read-only (mode=ro)"""
+    url = make_url(database_url)
+    if _is_memory(url):
+        # Not used for init_database: a separate in-memory engine would open its own,
+        # empty database, so in-memory URLs share the primary engine instead
+        return url
+    return url.set(
+        database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"}
+    )
+
+
+def _apply_pragmas(dbapi_connection: Any, pragmas: dict[str, Any]) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def _connection_pragmas() -> dict[str, Any]:
+    """Per-connection pragmas from the engine profile in settings"""
+    return {
+        "busy_timeout": int(settings.db_busy_timeout_ms),
+        "synchronous": settings.db_synchronous,
+        "temp_store": settings.db_temp_store,
+        "mmap_size": int(settings.db_mmap_size),
+        # Negative cache_size is in KiB
+        "cache_size": -int(settings.db_cache_size_kib),
+    }
+
+
+def create_engine(database_url: str) -> AsyncEngine:
+    """Create the read/write engine with the pragma profile and pool from settings
+
+    The journal mode is stored in the database file, so WAL also lets connections
+    of the read-only analytics engine read while the loader writes.
+    """
+    url = make_url(database_url)
+    pool_options = {}
+    if not _is_memory(url):
+        pool_options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout_seconds,
+        }
+    read_write = create_async_engine(url, echo=settings.db_echo, **pool_options)
+
+    @event.listens_for(read_write.sync_engine, "connect")
+    def configure_connection(dbapi_connection: Any, connection_record: Any) -> None:
+        _apply_pragmas(
+            dbapi_connection, {"journal_mode": settings.db_journal_mode, **_connection_pragmas()}
+        )
+
+    return read_write
+
+
+def create_analytics_engine(database_url: str) -> AsyncEngine:
+    """Create the read-only engine used to run generated SQL
+
+    Connections open the database with mode=ro and query_only, get mmap and page
+    cache pragmas sized for scans, and install an authorizer that rejects anything
+    other than reads.
+    """
+    analytics = create_async_engine(
+        _analytics_url(database_url),
+        echo=settings.db_echo,
+        pool_size=settings.analytics_pool_size,
+        max_overflow=0,
+        pool_timeout=settings.analytics_pool_timeout_seconds,
+    )
+
+    @event.listens_for(analytics.sync_engine, "connect")
+    def configure_connection(dbapi_connection: Any, connection_record: Any) -> None:
+        _apply_pragmas(
+            dbapi_connection,
+            {
+                "query_only": "ON",
+                **_connection_pragmas(),
+                "mmap_size": int(settings.analytics_mmap_size),
+                "cache_size": -int(settings.analytics_cache_size_kib),
+            },
+        )
+        dbapi_connection.run_async(lambda conn: conn.set_authorizer(_read_only_authorizer))
+
+    return analytics
+
 
 async def init_database() -> None:
-    """Initialize database engine and create tables"""
-    global engine, async_session_factory
+    """Initialize database engines and create tables"""
+    global engine, async_session_factory, analytics_engine, analytics_session_factory
 
     # Create async engine for SQLite
-    engine = create_async_engine(
-        settings.database_url,
-        echo=settings.debug,  # Log SQL queries in debug mode
-        future=True,
-    )
+    engine = create_engine(settings.database_url)
 
     # Create session factory
     async_session_factory = async_sessionmaker(
@@ -39,12 +161,27 @@ async def init_database() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # Read-only engine is created after the tables so mode=ro can open the file. An
+    # in-memory database only exists on the primary engine's connection, so it is
+    # shared and made read-only per session instead (see get_analytics_session).
+    if _is_memory(make_url(settings.database_url)):
+        analytics_engine = engine
+    else:
+        analytics_engine = create_analytics_engine(settings.database_url)
+    analytics_session_factory = async_sessionmaker(
+        analytics_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
 
 async def close_database() -> None:
     """Close database connections"""
     global engine
     if engine:
         await engine.dispose()
+    if analytics_engine and analytics_engine is not engine:
+        await analytics_engine.dispose()
 
 
 @asynccontextmanager
@@ -62,6 +199,8 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
 
     async with async_session_factory() as session:
         try:
+            with db_session_acquire_duration.time():
+                await session.connection()
             yield session
         except Exception:
             await session.rollback()
@@ -70,6 +209,37 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+@asynccontextmanager
+async def get_analytics_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Get a read-only session for generated analytics SQL
+
+    Usage:
+        async with get_analytics_session() as session:
+            result = await session.execute(text(sql))
+    """
+    if analytics_session_factory is None:
+        raise RuntimeError("Database not initialized. Call init_database() first.")
+
+    async with analytics_session_factory() as session:
+        # Sessions on a shared (in-memory) engine are read-only only while checked out
+        driver_connection = None
+        if analytics_engine is engine:
+            connection = await session.connection()
+            raw = (await connection.get_raw_connection()).driver_connection
+            assert raw is not None
+            await raw.execute("PRAGMA query_only = ON")
+            await raw.set_authorizer(_read_only_authorizer)
+            driver_connection = raw
+        try:
+            yield session
+        finally:
+            if driver_connection is not None:
+                await driver_connection.set_authorizer(None)
+                await driver_connection.execute("PRAGMA query_only = OFF")
+            await session.close()
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     FastAPI dependency to get database session
@@ -1,32 +1,126 @@
 """Structured logging configuration for Pulse"""
 
+import copy
 import logging
+import queue
+import random
 import sys
+import threading
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 
 import structlog
 
+from .metrics import log_records_dropped
 from .settings import settings
 
 
+# Background writer for queued logging; None when logging synchronously
+_listener: "BlockingSentinelListener | None" = None
+_queue_handler: "BoundedQueueHandler | None" = None
+
+# Marker that stops QueueListener's monitor thread (it checks for None)
+_LISTENER_SENTINEL = None
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Queue handler that defers rendering to the listener thread and counts drops
+
+    When the queue is full, records are dropped (and counted) unless block is set,
+    in which case the caller waits for room.
+    """
+
+    def __init__(self, log_queue: queue.Queue, block: bool = False) -> None:
+        super().__init__(log_queue)
+        # Kept with its full type; QueueHandler.queue is typed without put()
+        self.log_queue = log_queue
+        self.block = block
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only snapshot %-style arguments here; formatting happens in the listener
+        if record.args and not isinstance(record.msg, dict):
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.block:
+            self.log_queue.put(record)
+            return
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            log_records_dropped.inc()
+
+
+class BlockingSentinelListener(QueueListener):
+    """Queue listener whose stop() waits for room instead of failing on a full queue"""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        *handlers: logging.Handler,
+        respect_handler_level: bool = False,
+    ) -> None:
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.log_queue = log_queue
+
+    def enqueue_sentinel(self) -> None:
+        self.log_queue.put(_LISTENER_SENTINEL)
+
+
+def sample_by_logger(rates: Mapping[str, float]) -> Any:
+    """Build a processor that keeps only a fraction of a logger's sub-warning events"""
+
+    def processor(logger: Any, method_name: str, event_dict: dict[str, Any]) -> dict[str, Any]:
+        rate = rates.get(event_dict.get("logger", ""))
+        if (
+            rate is not None
+            and method_name in ("debug", "info")
+            and random.random() >= rate  # noqa: S311 - sampling, not security
+        ):
+            raise structlog.DropEvent
+        return event_dict
+
+    return processor
+
+
 def configure_logging() -> None:
     """Configure structured logging for the application"""
+    shutdown_logging()
+
+    renderer = (
+        structlog.processors.JSONRenderer()
+        if settings.json_logs
+        else structlog.dev.ConsoleRenderer()
+    )
+    processors = [
+        structlog.stdlib.filter_by_level,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        sample_by_logger(settings.log_sample_rates),
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.UnicodeDecoder(),
+    ]
 
-    # Configure structlog
+    # Configure structlog; with the queue enabled the event dict is rendered by the
+    # listener thread instead of on the request path
     structlog.configure(
         processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.UnicodeDecoder(),
+            *processors,
             (
-                structlog.processors.JSONRenderer()
-                if settings.json_logs
-                else structlog.dev.ConsoleRenderer()
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter
+                if settings.log_queue_enabled
+                else renderer
             ),
         ],
         context_class=dict,
@@ -35,18 +129,67 @@ def configure_logging() -> None:
         cache_logger_on_first_use=True,
     )
 
-    # Configure standard library logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, settings.log_level.upper()),
-    )
+    if settings.log_queue_enabled:
+        _configure_queue(renderer)
+    else:
+        # Configure standard library logging
+        logging.basicConfig(
+            format="%(message)s",
+            stream=sys.stdout,
+            level=getattr(logging, settings.log_level.upper()),
+        )
 
     # Set logging levels for external libraries
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 
+def _configure_queue(renderer: Any) -> None:
+    """Route all records through a bounded queue to a background writer thread"""
+    global _listener, _queue_handler
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processors=[structlog.stdlib.ProcessorFormatter.remove_processors_meta, renderer],
+            # Stdlib records (e.g. pulse.llm, uvicorn) get the same fields as structlog ones
+            foreign_pre_chain=[
+                structlog.stdlib.add_logger_name,
+                structlog.stdlib.add_log_level,
+                structlog.processors.TimeStamper(fmt="iso"),
+            ],
+        )
+    )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _queue_handler = BoundedQueueHandler(log_queue, block=settings.log_queue_block)
+    _listener = BlockingSentinelListener(log_queue, stream_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(getattr(logging, settings.log_level.upper()))
+
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush and stop the queued log writer, if running"""
+    global _listener
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_log_records() -> int:
+    """Number of records dropped because the log queue was full since it was configured"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
 def get_logger(name: str) -> Any:
     """Get a structured logger instance"""
     return structlog.get_logger(name)
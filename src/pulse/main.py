@@ -3,6 +3,7 @@ FastAPI application for Pulse
 Main application entry point with lifespan management
 """
 
+import asyncio
 import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
@@ -11,10 +12,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .database.session import close_database, init_database
-from .logging import configure_logging
-from .middleware.request_id import RequestIdMiddleware
-from .middleware.timing import TimingMiddleware
-from .routes import companies, health, visualizations
+from .logging import configure_logging, shutdown_logging
+from .metrics import write_snapshots_periodically
+from .middleware.request_context import RequestContextMiddleware
+from .routes import companies, health, metrics, visualizations
 from .settings import settings
 
 
@@ -32,11 +33,23 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await init_database()
     logger.info("Database initialized")
 
+    # With several workers, each one publishes its metrics for /metrics to merge
+    snapshot_writer = None
+    if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+        snapshot_writer = asyncio.create_task(
+            write_snapshots_periodically(
+                settings.metrics_multiprocess_dir, settings.metrics_flush_interval_seconds
+            )
+        )
+
     yield
 
     # Shutdown
+    if snapshot_writer is not None:
+        snapshot_writer.cancel()
     await close_database()
     logger.info("Pulse stopped")
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -47,8 +60,9 @@ app = FastAPI(
 )
 
 # Middleware
-app.add_middleware(RequestIdMiddleware)
-app.add_middleware(TimingMiddleware)
+app.add_middleware(
+    RequestContextMiddleware, trust_request_id_header=settings.trust_request_id_header
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_allow_origins,
@@ -61,6 +75,8 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(companies.router, prefix="/api/companies", tags=["companies"])
 app.include_router(visualizations.router, prefix="/api/visualizations", tags=["visualizations"])
+if settings.metrics_enabled:
+    app.include_router(metrics.router, tags=["metrics"])
 
 
 @app.get("/")
@@ -0,0 +1,383 @@
+"""In-process Prometheus-style metrics for Pulse
+
+Metrics live in a per-process registry. With several uvicorn workers, set
+``PULSE_METRICS_MULTIPROCESS_DIR``: each worker periodically writes a JSON snapshot
+there and ``/metrics`` merges every worker's snapshot, so any worker can answer a
+scrape. When a worker starts, snapshots of exited workers are retired: their gauges
+are dropped and their counters and histograms are kept in a ``retired-*.json`` file,
+so merged totals never go backwards when a worker restarts. Clear the directory on
+deploy to reset them.
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from .settings import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+RETIRED_PREFIX = "retired-"
+
+# Tells this process's snapshot apart from one left by an earlier process with the same pid
+_STARTED = time.time()
+
+
+class Metric:
+    """Base class for a named metric with a fixed set of label names"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-serializable copy of the metric and its samples"""
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {
+            "kind": self.kind,
+            "documentation": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": json.loads(json.dumps(samples)),
+        }
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            index = next(
+                (i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets)
+            )
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the text exposition format"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} already registered differently")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Snapshot of every registered metric, keyed by name"""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def write_snapshot(self, directory: str) -> None:
+        """Atomically write this process's snapshot as <pid>.json in directory"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        snapshot = {"pid": os.getpid(), "started": _STARTED, "metrics": self.snapshot()}
+        _write_atomic(path / f"{os.getpid()}.json", snapshot)
+
+    def retire_snapshots(self, directory: str, max_age: float) -> None:
+        """Keep only the counters and histograms of snapshots whose worker is gone
+
+        A snapshot is retired when its process has exited, when an earlier process
+        with this pid left it, or when it has not been refreshed within max_age seconds.
+        Its gauges are dropped and the rest is moved to a retired- file named after the
+        snapshot, so workers retiring the same file concurrently write the same result.
+        """
+        now = time.time()
+        for file in Path(directory).glob("*.json"):
+            if file.name.startswith(RETIRED_PREFIX):
+                continue
+            try:
+                modified = file.stat().st_mtime_ns
+                data = json.loads(file.read_text())
+            except (OSError, ValueError):
+                continue  # Already retired by another worker, or unreadable
+
+            pid = data.get("pid")
+            if pid == os.getpid():
+                current = data.get("started") == _STARTED
+            else:
+                current = (
+                    isinstance(pid, int) and _pid_alive(pid) and now - modified / 1e9 <= max_age
+                )
+            if current:
+                continue
+
+            metrics = {n: m for n, m in data.get("metrics", {}).items() if m.get("kind") != "gauge"}
+            retired = file.with_name(f"{RETIRED_PREFIX}{file.stem}-{modified}.json")
+            try:
+                _write_atomic(retired, {"pid": None, "metrics": metrics})
+                file.unlink()
+            except OSError:
+                continue
+
+    def render(self, directory: str | None = None) -> str:
+        """Render metrics, merged with other workers' snapshots when a directory is set"""
+        if not directory:
+            return render_snapshots([self.snapshot()])
+
+        self.write_snapshot(directory)
+        snapshots = []
+        for file in sorted(Path(directory).glob("*.json")):
+            try:
+                data = json.loads(file.read_text())
+            except (OSError, ValueError):
+                continue  # Being replaced or unreadable; the next scrape picks it up
+            metrics = data.get("metrics", {})
+            pid = data.get("pid")
+            if not isinstance(pid, int) or not _pid_alive(pid):
+                metrics = {n: m for n, m in metrics.items() if m.get("kind") != "gauge"}
+            snapshots.append(metrics)
+        return render_snapshots(snapshots)
+
+
+def _write_atomic(path: Path, data: dict[str, Any]) -> None:
+    """Write JSON through a temporary file so readers never see a partial snapshot"""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a worker process with this pid is still running"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _merge(snapshots: Sequence[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Sum samples with the same metric name and labels across snapshots"""
+    merged: dict[str, dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            values = target["values"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["kind"] == "histogram":
+                    current = values.get(key)
+                    if current is None:
+                        values[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0], strict=True)]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    values[key] = values.get(key, 0.0) + value
+    return merged
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values
+    )
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped, strict=True)) + "}"
+
+
+def render_snapshots(snapshots: Sequence[dict[str, Any]]) -> str:
+    """Render one or more registry snapshots in the Prometheus text format"""
+    lines = []
+    for name, metric in sorted(_merge(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labelnames"]
+
+        for key, value in sorted(metric["values"].items()):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip([*metric["buckets"], math.inf], counts, strict=True):
+                cumulative += bucket_count
+                labels = _format_labels([*labelnames, "le"], [*key, _format_value(bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _format_labels(labelnames, key)
+            lines.append(f"{name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{name}_count{labels} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+# Global registry and the metrics Pulse records
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "pulse_http_request_duration_seconds",
+    "HTTP request latency by route template and status",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "pulse_http_requests_in_flight", "HTTP requests currently being handled"
+)
+db_session_acquire_duration = registry.histogram(
+    "pulse_db_session_acquire_seconds",
+    "Time to check out a database connection for a session",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+llm_stage_duration = registry.histogram(
+    "pulse_llm_stage_duration_seconds",
+    "Visualization pipeline stage latency (llm, parse, sanitize, prepare, sql)",
+    ("stage",),
+)
+llm_rows_returned = registry.histogram(
+    "pulse_llm_rows_returned",
+    "Rows returned by visualization queries",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+)
+llm_plans = registry.counter(
+    "pulse_llm_plans_total",
+    "Visualization plans by source (intent, plan_cache, model)",
+    ("source",),
+)
+llm_sql_repairs = registry.counter(
+    "pulse_llm_sql_repairs_total",
+    "Model plans whose SQL needed a repair turn, by outcome (repaired, failed)",
+    ("outcome",),
+)
+sql_cost_guard_actions = registry.counter(
+    "pulse_sql_cost_guard_total",
+    "Generated queries the cost guard acted on, by action (limit, heavy, reject)",
+    ("action",),
+)
+llm_calls_in_flight = registry.gauge(
+    "pulse_llm_calls_in_flight", "Model calls currently holding a concurrency slot"
+)
+llm_calls_waiting = registry.gauge(
+    "pulse_llm_calls_waiting", "Model calls waiting for a concurrency slot"
+)
+log_records_dropped = registry.counter(
+    "pulse_log_records_dropped_total", "Log records dropped because the log queue was full"
+)
+
+
+async def write_snapshots_periodically(directory: str, interval: float) -> None:
+    """Keep this worker's snapshot fresh for scrapes answered by other workers
+
+    Snapshots of exited workers, or ones a live worker has stopped refreshing for a few
+    intervals, are retired first so their gauges stop being reported.
+    """
+    await asyncio.to_thread(registry.retire_snapshots, directory, 3 * interval)
+    while True:
+        await asyncio.to_thread(registry.write_snapshot, directory)
+        await asyncio.sleep(interval)
+
+
+def render_metrics() -> str:
+    """Render the global registry, merged across workers when configured"""
+    return registry.render(settings.metrics_multiprocess_dir or None)
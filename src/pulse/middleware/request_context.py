@@ -0,0 +1,104 @@
+"""Request context middleware: request id and timing in one pure ASGI layer"""
+
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import server_timing
+from ..logging import get_logger
+from ..metrics import http_request_duration, http_requests_in_flight
+
+
+logger = get_logger("pulse.request")
+
+# Request id of the request being handled, for code without access to the Request
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# Inbound ids end up in logs and headers, so only accept short token-like values
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestContextMiddleware:
+    """Assign a request id, time the request and add X-Request-ID / X-Process-Time headers
+
+    Stage timings recorded during the request (see pulse.server_timing) are sent as a
+    Server-Timing header and logged. Also records the in-flight gauge and the per-route
+    latency histogram.
+
+    Written as raw ASGI rather than BaseHTTPMiddleware, so there is no extra task or
+    memory stream per request and streaming responses pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, trust_request_id_header: bool = False) -> None:
+        self.app = app
+        self.trust_request_id_header = trust_request_id_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = self._inbound_request_id(scope) or str(uuid.uuid4())
+        status_code = 500
+
+        # Route handlers read this as request.state.request_id
+        scope.setdefault("state", {})["request_id"] = request_id
+        token = request_id_var.set(request_id)
+        timings_token = server_timing.start_request()
+        http_requests_in_flight.inc()
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Process-Time"] = f"{time.perf_counter() - start_time:.4f}"
+                timings = server_timing.current()
+                if timings:
+                    headers["Server-Timing"] = server_timing.header_value(timings)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration = time.perf_counter() - start_time
+            timings = server_timing.current()
+            server_timing.end_request(timings_token)
+            request_id_var.reset(token)
+            http_requests_in_flight.dec()
+
+            http_request_duration.observe(
+                duration, method=scope["method"], route=_route_template(scope), status=status_code
+            )
+            logger.info(
+                "Request completed",
+                request_id=request_id,
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                duration_ms=round(duration * 1000, 2),
+                **({"timings_ms": timings} if timings else {}),
+            )
+
+    def _inbound_request_id(self, scope: Scope) -> str | None:
+        """Return the client's X-Request-ID when trusted and well-formed"""
+        if not self.trust_request_id_header:
+            return None
+        request_id = Headers(scope=scope).get("x-request-id")
+        if request_id and _VALID_REQUEST_ID.fullmatch(request_id):
+            return request_id
+        return None
+
+
+def _route_template(scope: Scope) -> str:
+    """Matched route template, e.g. /api/companies/{company_id}, to keep label cardinality low"""
+    # Routes in included routers only know their own path; FastAPI records the full one here
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
@@ -1,26 +0,0 @@
-"""Request ID middleware for request tracing"""
-
-import uuid
-from collections.abc import Callable
-
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-
-
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    """Add unique request ID to each request for tracing"""
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate unique request ID
-        request_id = str(uuid.uuid4())
-
-        # Add to request state for access in route handlers
-        request.state.request_id = request_id
-
-        # Process request
-        response = await call_next(request)
-
-        # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
-
-        return response
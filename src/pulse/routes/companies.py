@@ -4,23 +4,55 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database.session import get_session
-from ..schemas.companies import CompanyResponse
-from ..services.companies import company_service
+from ..schemas.companies import CompanyPage, CompanyResponse
+from ..services.companies import SORT_KEYS, company_service
 
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[CompanyResponse])
+@router.get("/", response_model=list[CompanyResponse] | CompanyPage)
 async def get_companies(
     skip: int = Query(0, ge=0, description="Number of companies to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of companies to return"),
     industry: str = Query(None, description="Filter by industry"),
+    investor: str = Query(None, description="Filter by top investor name"),
+    sort: str = Query(
+        "company_name", description=f"Sort key, prefix with '-' for descending: {SORT_KEYS}"
+    ),
+    cursor: str | None = Query(
+        None,
+        description="Keyset pagination cursor; pass an empty value for the first page. "
+        "When set, the response is a page with items and next_cursor and skip is ignored",
+    ),
     session: AsyncSession = Depends(get_session),
 ):
     """Get list of companies with pagination and filters"""
+    if sort not in SORT_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sort key. Allowed: {', '.join(SORT_KEYS)}",
+        )
+
+    if cursor is not None:
+        try:
+            companies, next_cursor = await company_service.get_companies_page(
+                session,
+                cursor=cursor,
+                limit=limit,
+                industry=industry,
+                investor=investor,
+                sort=sort,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+        return CompanyPage(
+            items=[CompanyResponse.model_validate(company) for company in companies],
+            next_cursor=next_cursor,
+        )
+
     companies = await company_service.get_companies(
-        session, skip=skip, limit=limit, industry=industry
+        session, skip=skip, limit=limit, industry=industry, investor=investor, sort=sort
     )
     return companies
 
@@ -0,0 +1,24 @@
+"""Prometheus metrics endpoint"""
+
+from fastapi import APIRouter, Response
+
+from ..metrics import (
+    CONTENT_TYPE,
+    llm_calls_in_flight,
+    llm_calls_waiting,
+    render_metrics,
+)
+from ..services.llm import llm_service
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Metrics in the Prometheus text exposition format"""
+    # Point-in-time values are sampled when scraped
+    llm_calls_in_flight.set(llm_service.limiter.in_flight)
+    llm_calls_waiting.set(llm_service.limiter.waiting)
+
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,13 +1,60 @@
 """Visualization routes for natural language queries"""
 
-from fastapi import APIRouter, HTTPException, status
+import json
+from collections.abc import AsyncGenerator
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from .. import server_timing
 from ..services.llm import llm_service
+from ..services.results import DataFormat, format_data
+from ..settings import settings
 
 
 router = APIRouter()
 
+# Accept header media type that selects the columnar data format
+COLUMNAR_MEDIA_TYPE = "application/vnd.pulse.columnar+json"
+
+
+def _accepts_columnar(accept: str) -> bool:
+    """Whether the Accept header prefers the columnar media type
+
+    Media ranges are compared by their q values; columnar wins ties, so
+    "columnar, application/json" selects it while q=0 or a higher-ranked type does not.
+    """
+    qualities: dict[str, float] = {}
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type.lower()] = quality
+
+    columnar = qualities.pop(COLUMNAR_MEDIA_TYPE, 0.0)
+    return columnar > 0 and columnar >= max(qualities.values(), default=0.0)
+
+
+def get_data_format(
+    data_format: DataFormat | None = Query(
+        None, alias="format", description="Shape of data: rows (default) or columnar"
+    ),
+    accept: str = Header(""),
+) -> DataFormat:
+    """Data format from the format query parameter, else from the Accept header"""
+    if data_format is not None:
+        return data_format
+    return "columnar" if _accepts_columnar(accept) else "rows"
+
 
 class VisualizationRequest(BaseModel):
     """Request model for visualization generation"""
@@ -37,10 +84,12 @@ class VisualizationResponse(BaseModel):
     success: bool
     visualization_type: str
     title: str
-    data: list
+    data: list | dict  # Rows, or {"columns": [...], "values": {column: [...]}}
     chart_config: ChartConfig = ChartConfig()
     sql: str = ""
     error: str = ""
+    truncated: bool = False  # Rows were cut at the configured row cap
+    timings: dict[str, float] | None = None  # Stage timings in ms, debug mode only
 
 
 class ModificationRequest(BaseModel):
@@ -51,55 +100,84 @@ class ModificationRequest(BaseModel):
 
 
 @router.post("/generate", response_model=VisualizationResponse)
-async def generate_visualization(request: VisualizationRequest):
+async def generate_visualization(
+    request: VisualizationRequest, data_format: DataFormat = Depends(get_data_format)
+):
     """Generate visualization from natural language prompt"""
     if not request.prompt or not request.prompt.strip():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Prompt is required")
 
     try:
-        result = await llm_service.process_query(request.prompt.strip())
-        return VisualizationResponse(**result)
+        result = await llm_service.process_query(request.prompt.strip(), data_format)
+        response = VisualizationResponse(**result)
     except Exception as e:
-        return VisualizationResponse(
+        response = VisualizationResponse(
             success=False,
             visualization_type="error",
             title="Error Processing Request",
-            data=[],
+            data=format_data([], data_format),
             error=str(e),
         )
 
+    if settings.debug:
+        response.timings = server_timing.current()
 
-@router.post("/modify", response_model=VisualizationResponse)
-async def modify_visualization(request: ModificationRequest):
-    """Modify existing visualization with styling/format changes"""
+    # Serialize here rather than in FastAPI so the cost shows up as its own stage
+    with server_timing.timed("serialize"):
+        body = response.model_dump_json()
+    return Response(body, media_type="application/json", headers={"Vary": "Accept"})
+
+
+@router.post("/generate/stream")
+async def stream_visualization(request: VisualizationRequest):
+    """Generate a visualization, streaming pipeline stages as Server-Sent Events"""
     if not request.prompt or not request.prompt.strip():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Prompt is required")
 
-    try:
-        # Create a context-aware prompt that includes the existing visualization
-        import json as json_module
+    async def event_stream() -> AsyncGenerator[str, None]:
+        async for event in llm_service.stream_query(request.prompt.strip()):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
 
-        config_str = json_module.dumps(request.existing_visualization.get("chart_config", {}))
-        context_prompt = f"""
-        EXISTING VISUALIZATION:
-        Type: {request.existing_visualization.get('visualization_type', 'unknown')}
-        Title: {request.existing_visualization.get('title', 'untitled')}
-        SQL: {request.existing_visualization.get('sql', '')}
-        Current Config: {config_str}
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        MODIFICATION REQUEST: {request.prompt}
 
-        Please modify the visualization based on the request. Keep the same SQL and data,
-        only change styling/formatting.
-        """
+@router.post("/modify", response_model=VisualizationResponse)
+async def modify_visualization(
+    request: ModificationRequest,
+    response: Response,
+    data_format: DataFormat = Depends(get_data_format),
+):
+    """Modify existing visualization with styling/format changes"""
+    if not request.prompt or not request.prompt.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Prompt is required")
 
-        result = await llm_service.process_query(context_prompt.strip())
+    response.headers["Vary"] = "Accept"
+    try:
+        result = await llm_service.modify_visualization(
+            request.existing_visualization, request.prompt.strip(), data_format
+        )
         return VisualizationResponse(**result)
     except Exception as e:
         return VisualizationResponse(
             success=False,
             visualization_type="error",
             title="Error Modifying Visualization",
-            data=[],
+            data=format_data([], data_format),
             error=str(e),
         )
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Visualization cache hit/miss counters and LLM prompt cache token usage"""
+    return {
+        "intent_matches": llm_service.intents.matches,
+        "plan_cache": llm_service.plan_cache.stats(),
+        "result_cache": llm_service.result_cache.stats(),
+        "llm_usage": llm_service.usage,
+    }
@@ -31,3 +31,10 @@ class CompanyResponse(CompanyBase):
 
     class Config:
         from_attributes = True
+
+
+class CompanyPage(BaseModel):
+    """Schema for a cursor-paginated page of companies"""
+
+    items: list[CompanyResponse]
+    next_cursor: str | None = None
@@ -0,0 +1,73 @@
+"""Request-scoped stage timings, reported in the Server-Timing response header"""
+
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+
+# Stage name -> accumulated milliseconds for the request being handled
+_timings: ContextVar[dict[str, float] | None] = ContextVar("server_timings", default=None)
+
+
+def start_request() -> Token:
+    """Begin collecting timings for a request; pass the token to end_request"""
+    return _timings.set({})
+
+
+def end_request(token: Token) -> None:
+    """Stop collecting timings for the current request"""
+    _timings.reset(token)
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a stage duration to the current request; a no-op outside of a request"""
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000
+
+
+def merge(timings: dict[str, float]) -> None:
+    """Add timings (in ms) captured elsewhere to the current request"""
+    current_timings = _timings.get()
+    if current_timings is not None:
+        for stage, ms in timings.items():
+            current_timings[stage] = current_timings.get(stage, 0.0) + ms
+
+
+async def capture(awaitable: Awaitable[T]) -> tuple[T, dict[str, float]]:
+    """Await in a separate timing scope, returning the result and the timings it recorded
+
+    Used for work shared between requests (see SingleFlight) so that every request,
+    not just the one that started the work, can merge its stages.
+    """
+    timings: dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        return await awaitable, timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the duration of the block as a stage of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def current() -> dict[str, float]:
+    """Timings recorded so far for the current request, rounded to 0.01 ms"""
+    return {stage: round(ms, 2) for stage, ms in (_timings.get() or {}).items()}
+
+
+def header_value(timings: dict[str, float]) -> str:
+    """Format timings as a Server-Timing header value, e.g. ``llm;dur=812.4, sql;dur=3.1``"""
+    return ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in timings.items())
@@ -0,0 +1,118 @@
+"""In-memory caches for visualization results"""
+
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+
+# Keep comparison operators so prompts that differ only by "<" vs ">" never collide
+_PUNCTUATION_RE = re.compile(r"[^\w\s<>=!]|!(?!=)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Fold case, punctuation and whitespace so equivalent prompts share a cache key"""
+    folded = _PUNCTUATION_RE.sub(" ", prompt.lower())
+    return _WHITESPACE_RE.sub(" ", folded).strip()
+
+
+def _json_default(value: Any) -> Any:
+    # Query results (QueryRows) are sized by their columnar form
+    if hasattr(value, "columnar"):
+        return value.columnar()
+    return str(value)
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the in-memory footprint of a value by its JSON length"""
+    return len(json.dumps(value, default=_json_default))
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    version: int | None
+    expires_at: float
+    size: int
+
+
+class TTLCache:
+    """LRU cache bounded by entry count and total size, with per-entry TTL
+
+    Entries stored with a ``version`` are treated as stale once a lookup asks for a
+    different version, which lets callers invalidate everything derived from a table
+    by bumping its data version.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, version: int | None = None) -> Any | None:
+        """Return a cached value, or None on a miss, expiry or version mismatch"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.monotonic() or entry.version != version:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, version: int | None = None) -> None:
+        """Store a value, evicting least recently used entries to stay within bounds"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = _CacheEntry(
+            value=value,
+            version=version,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            size=size,
+        )
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters and current occupancy"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
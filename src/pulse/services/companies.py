@@ -1,9 +1,76 @@
 """Company service for business logic"""
 
-from sqlalchemy import select
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Iterator, Sequence
+from typing import Any, TypeVar
+
+from sqlalchemy import Select, delete, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.models import Company
+from ..database.models import Company, CompanyInvestor, CompanyProduct, Investor, Product
+
+
+# Sort keys the companies list accepts; each is indexed so (key, id) seeks stay cheap.
+# A leading "-" sorts descending.
+SORT_COLUMNS = {
+    "company_name": Company.company_name,
+    "founded_year": Company.founded_year,
+    "arr_usd": Company.arr_usd,
+    "valuation_usd": Company.valuation_usd,
+    "g2_rating": Company.g2_rating,
+}
+SORT_KEYS = [*SORT_COLUMNS, *(f"-{key}" for key in SORT_COLUMNS)]
+
+# Bound parameters per IN list or multi-row VALUES statement, well under SQLite's
+# 32766 variable limit, so large loader batches are split into several statements
+MAX_BOUND_PARAMETERS = 10_000
+
+T = TypeVar("T")
+
+
+def chunked(items: Sequence[T], parameters_per_item: int = 1) -> Iterator[Sequence[T]]:
+    """Split items into slices that bind at most MAX_BOUND_PARAMETERS parameters"""
+    size = max(1, MAX_BOUND_PARAMETERS // parameters_per_item)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def content_hash(values: dict[str, Any]) -> str:
+    """Stable SHA-256 of a normalized company row, used to detect changed rows"""
+    payload = json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def encode_cursor(sort: str, value: Any, company_id: int) -> str:
+    """Encode the last row of a page as an opaque cursor"""
+    payload = json.dumps([sort, value, company_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    """Decode a cursor into the (sort value, id) it points past
+
+    The value is bound into the seek comparison, so it must be a scalar of the sort
+    column's type; anything else raises ValueError like a malformed cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, company_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if cursor_sort != sort or not isinstance(company_id, int):
+        raise ValueError("Cursor does not match the requested sort order")
+
+    column_type = SORT_COLUMNS[sort.lstrip("-")].type.python_type
+    expected = (str,) if column_type is str else (int, float)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, expected)):
+        raise ValueError("Invalid cursor")
+    return value, company_id
 
 
 class CompanyService:
@@ -33,16 +100,214 @@ class CompanyService:
         skip: int = 0,
         limit: int = 100,
         industry: str | None = None,
+        investor: str | None = None,
+        sort: str = "company_name",
     ) -> list[Company]:
         """Get list of companies with pagination and filters"""
+        stmt = self._filtered_query(industry, investor)
+        stmt = stmt.order_by(*self._sort_order(sort)).offset(skip).limit(limit)
+        result = await session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_companies_page(
+        self,
+        session: AsyncSession,
+        cursor: str | None = None,
+        limit: int = 100,
+        industry: str | None = None,
+        investor: str | None = None,
+        sort: str = "company_name",
+    ) -> tuple[list[Company], str | None]:
+        """Get one keyset page of companies and the cursor for the next page
+
+        Seeks past the cursor's (sort value, id) instead of skipping rows, so every
+        page costs the same as the first. Raises ValueError for a malformed cursor.
+        """
+        column = SORT_COLUMNS[sort.lstrip("-")]
+        descending = sort.startswith("-")
+        stmt = self._filtered_query(industry, investor)
+
+        if cursor:
+            value, company_id = decode_cursor(cursor, sort)
+            position = tuple_(column, Company.id)
+            stmt = stmt.where(
+                position < (value, company_id) if descending else position > (value, company_id)
+            )
+
+        # Fetch one extra row to learn whether another page exists
+        stmt = stmt.order_by(*self._sort_order(sort)).limit(limit + 1)
+        result = await session.execute(stmt)
+        companies = list(result.scalars().all())
+
+        next_cursor = None
+        if len(companies) > limit:
+            companies = companies[:limit]
+            last = companies[-1]
+            next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+        return companies, next_cursor
+
+    def _filtered_query(self, industry: str | None, investor: str | None) -> Select:
+        """Build the companies select with the list filters applied"""
         stmt = select(Company)
 
         if industry:
             stmt = stmt.where(Company.industry == industry)
 
-        stmt = stmt.offset(skip).limit(limit).order_by(Company.company_name)
-        result = await session.execute(stmt)
-        return list(result.scalars().all())
+        if investor:
+            stmt = (
+                stmt.join(CompanyInvestor, CompanyInvestor.company_id == Company.id)
+                .join(Investor, Investor.id == CompanyInvestor.investor_id)
+                .where(Investor.name == investor)
+            )
+
+        return stmt
+
+    def _sort_order(self, sort: str) -> tuple:
+        """ORDER BY clauses for a sort key, with id as the unique tie-breaker"""
+        column = SORT_COLUMNS[sort.lstrip("-")]
+        if sort.startswith("-"):
+            return column.desc(), Company.id.desc()
+        return column, Company.id
+
+    async def insert_companies(
+        self, session: AsyncSession, rows: Sequence[dict[str, Any]]
+    ) -> list[int]:
+        """Bulk insert normalized company rows and their links; the caller commits"""
+        if not rows:
+            return []
+
+        rows = [{**row, "content_hash": content_hash(row)} for row in rows]
+        # executemany with RETURNING; sorted so ids line up with the input rows
+        result = await session.execute(
+            insert(Company).returning(Company.id, sort_by_parameter_order=True), rows
+        )
+        company_ids = list(result.scalars().all())
+
+        await self.sync_company_links(
+            session,
+            [
+                (company_id, row["top_investors"], row["product"])
+                for company_id, row in zip(company_ids, rows, strict=True)
+            ],
+        )
+        return company_ids
+
+    async def upsert_companies(
+        self, session: AsyncSession, rows: Sequence[dict[str, Any]]
+    ) -> dict[str, int]:
+        """Insert new, update changed and skip unchanged rows keyed on (company_name, founded_year)
+
+        Returns inserted/updated/unchanged counts; the caller commits.
+        """
+        # A natural key repeated within the batch keeps its last row
+        rows_by_key = {
+            (row["company_name"], row["founded_year"]): {**row, "content_hash": content_hash(row)}
+            for row in rows
+        }
+        if not rows_by_key:
+            return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        existing: dict[tuple[str, int], tuple[int, str | None]] = {}
+        for keys in chunked(list(rows_by_key), parameters_per_item=2):
+            result = await session.execute(
+                select(
+                    Company.company_name, Company.founded_year, Company.id, Company.content_hash
+                ).where(tuple_(Company.company_name, Company.founded_year).in_(keys))
+            )
+            existing.update(
+                ((name, year), (company_id, hash_)) for name, year, company_id, hash_ in result
+            )
+
+        new_rows: list[dict[str, Any]] = []
+        changed_rows: list[dict[str, Any]] = []
+        for key, row in rows_by_key.items():
+            if key not in existing:
+                new_rows.append(row)
+            elif existing[key][1] != row["content_hash"]:
+                changed_rows.append({**row, "id": existing[key][0]})
+
+        links: list[tuple[int, list[str], list[str]]] = []
+        if new_rows:
+            inserted = await session.execute(
+                insert(Company).returning(Company.id, sort_by_parameter_order=True), new_rows
+            )
+            links.extend(
+                (company_id, row["top_investors"], row["product"])
+                for company_id, row in zip(inserted.scalars().all(), new_rows, strict=True)
+            )
+
+        if changed_rows:
+            # Bulk UPDATE by primary key; updated_at is bumped by its onupdate default
+            await session.execute(update(Company), changed_rows)
+            links.extend((row["id"], row["top_investors"], row["product"]) for row in changed_rows)
+
+        await self.sync_company_links(session, links)
+        return {
+            "inserted": len(new_rows),
+            "updated": len(changed_rows),
+            "unchanged": len(rows_by_key) - len(new_rows) - len(changed_rows),
+        }
+
+    async def sync_company_links(
+        self, session: AsyncSession, companies: Sequence[tuple[int, list[str], list[str]]]
+    ) -> None:
+        """Mirror (company_id, top_investors, product) JSON lists into the link tables
+
+        Existing links for the given companies are replaced; the caller commits.
+        """
+        if not companies:
+            return
+
+        company_ids = [company_id for company_id, _, _ in companies]
+        investors = {company_id: names for company_id, names, _ in companies}
+        products = {company_id: names for company_id, _, names in companies}
+
+        await self._sync_links(
+            session, company_ids, investors, Investor, CompanyInvestor, "investor_id"
+        )
+        await self._sync_links(
+            session, company_ids, products, Product, CompanyProduct, "product_id"
+        )
+
+    async def _sync_links(
+        self,
+        session: AsyncSession,
+        company_ids: list[int],
+        names_by_company: dict[int, list[str]],
+        entity: type[Investor] | type[Product],
+        link: type[CompanyInvestor] | type[CompanyProduct],
+        link_column: str,
+    ) -> None:
+        """Upsert names into an entity table and replace the companies' link rows"""
+        names = sorted(
+            {name for company_names in names_by_company.values() for name in company_names}
+        )
+        ids_by_name: dict[str, int] = {}
+        for names_chunk in chunked(names):
+            await session.execute(
+                sqlite_insert(entity)
+                .values([{"name": name} for name in names_chunk])
+                .on_conflict_do_nothing(index_elements=["name"])
+            )
+            result = await session.execute(
+                select(entity.name, entity.id).where(entity.name.in_(names_chunk))
+            )
+            ids_by_name.update(result.tuples().all())
+
+        for ids_chunk in chunked(company_ids):
+            await session.execute(delete(link).where(link.company_id.in_(ids_chunk)))
+
+        # A name listed twice for the same company only gets one link row
+        rows: dict[tuple[int, int], dict[str, Any]] = {}
+        for company_id, company_names in names_by_company.items():
+            for position, name in enumerate(company_names):
+                key = (company_id, ids_by_name[name])
+                rows.setdefault(
+                    key, {"company_id": company_id, link_column: key[1], "position": position}
+                )
+
+        if rows:
+            await session.execute(insert(link), list(rows.values()))
 
 
 # Global service instance
@@ -0,0 +1,34 @@
+"""Data version tracking used to invalidate derived caches"""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database.models import DataVersion
+
+
+class DataVersionService:
+    """Service for reading and bumping per-table data versions"""
+
+    async def get_version(self, session: AsyncSession, table_name: str) -> int:
+        """Get the current data version of a table (0 if never bumped)"""
+        stmt = select(DataVersion.version).where(DataVersion.table_name == table_name)
+        result = await session.execute(stmt)
+        return result.scalar_one_or_none() or 0
+
+    async def bump_version(self, session: AsyncSession, table_name: str) -> int:
+        """Increment the data version of a table; the caller commits the session"""
+        stmt = select(DataVersion).where(DataVersion.table_name == table_name)
+        result = await session.execute(stmt)
+        data_version = result.scalar_one_or_none()
+
+        if data_version is None:
+            data_version = DataVersion(table_name=table_name, version=0)
+            session.add(data_version)
+
+        data_version.version += 1
+        await session.flush()
+        return data_version.version
+
+
+# Global service instance
+data_version_service = DataVersionService()
@@ -0,0 +1,357 @@
+"""Local intent matching for common visualization prompts
+
+Prompts that clearly ask for one of the registered visualizations are answered with
+pre-vetted SQL and chart config, without a model round trip. A prompt only matches
+when every word is part of the intent's vocabulary, a chart word or a known filler
+word; anything else (filters, names, numbers, extra fields, an unsupported chart type)
+falls through to the LLM.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from .cache import normalize_prompt
+
+
+# Words that name a dataset field; a prompt mentioning a field the intent does not
+# cover is asking for something else
+FIELD_WORDS = frozenset(
+    {
+        "industry",
+        "industries",
+        "sector",
+        "sectors",
+        "founded",
+        "founding",
+        "year",
+        "years",
+        "age",
+        "valuation",
+        "valuations",
+        "valued",
+        "arr",
+        "revenue",
+        "recurring",
+        "funding",
+        "funded",
+        "raised",
+        "employee",
+        "employees",
+        "headcount",
+        "investor",
+        "investors",
+        "backers",
+        "vc",
+        "vcs",
+        "product",
+        "products",
+        "rating",
+        "ratings",
+        "g2",
+        "headquarters",
+        "hq",
+        "location",
+        "country",
+        "city",
+    }
+)
+
+# The model is told never to answer with a table chart, so a table request is served
+# as the bar chart the model would have drawn
+CHART_WORDS = {
+    "pie": "pie",
+    "donut": "pie",
+    "doughnut": "pie",
+    "bar": "bar",
+    "histogram": "bar",
+    "scatter": "scatter",
+    "line": "line",
+    "table": "bar",
+}
+
+# Filler words a canonical prompt may contain besides its intent's vocabulary. Any
+# other word (a company, place, investor, sector or scale option) may be a filter
+# or a modifier, so the prompt goes to the model instead.
+STOPWORDS = frozenset(
+    {
+        "a",
+        "an",
+        "the",
+        "of",
+        "and",
+        "as",
+        "to",
+        "me",
+        "us",
+        "i",
+        "if",
+        "want",
+        "would",
+        "like",
+        "see",
+        "is",
+        "are",
+        "which",
+        "what",
+        "who",
+        "how",
+        "show",
+        "give",
+        "create",
+        "make",
+        "draw",
+        "display",
+        "plot",
+        "chart",
+        "graph",
+        "diagram",
+        "visualize",
+        "visualise",
+        "visualization",
+        "visualisation",
+        "representing",
+        "representation",
+        "best",
+        "data",
+        "understand",
+        "correlation",
+        "relationship",
+        "vs",
+        "versus",
+        "against",
+        "companies",
+        "company",
+        "please",
+    }
+)
+
+# Filters, comparisons and inversions change the query in ways a fixed template can't
+QUALIFIER_WORDS = frozenset(
+    {
+        "where",
+        "only",
+        "except",
+        "excluding",
+        "exclude",
+        "without",
+        "not",
+        "after",
+        "before",
+        "since",
+        "between",
+        "above",
+        "below",
+        "under",
+        "than",
+        "greater",
+        "less",
+        "fewer",
+        "least",
+        "bottom",
+        "filter",
+        "filtered",
+        "average",
+        "median",
+        "sum",
+        "trend",
+        "trends",
+        "growth",
+    }
+)
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A visualization recognised from prompt keywords
+
+    Every group in ``keywords`` must be matched by at least one prompt word.
+    """
+
+    name: str
+    keywords: tuple[frozenset[str], ...]
+    sql: str
+    visualization_type: str
+    title: str
+    chart_config: dict[str, Any] = field(default_factory=dict)
+    alternate_types: tuple[str, ...] = ()
+
+    @property
+    def vocabulary(self) -> frozenset[str]:
+        return frozenset().union(*self.keywords)
+
+
+class IntentMatcher:
+    """Match prompts against registered intents"""
+
+    def __init__(self, intents: list[Intent] | None = None):
+        self.intents: list[Intent] = []
+        self.matches = 0
+        for intent in intents or []:
+            self.register(intent)
+
+    def register(self, intent: Intent) -> None:
+        """Add an intent; earlier registrations win when several match"""
+        self.intents.append(intent)
+
+    def match(self, prompt: str) -> dict[str, Any] | None:
+        """Return a visualization plan for a confidently matched prompt, else None"""
+        words = set(normalize_prompt(prompt).replace("_", " ").split())
+        if not words or words & QUALIFIER_WORDS or any(word.isdigit() for word in words):
+            return None
+
+        requested_types = {CHART_WORDS[word] for word in words if word in CHART_WORDS}
+        if len(requested_types) > 1:
+            return None
+
+        for intent in self.intents:
+            plan = self._match_intent(intent, words, requested_types)
+            if plan is not None:
+                self.matches += 1
+                return plan
+
+        return None
+
+    def _match_intent(
+        self, intent: Intent, words: set[str], requested_types: set[str]
+    ) -> dict[str, Any] | None:
+        if not all(words & group for group in intent.keywords):
+            return None
+
+        if (words & FIELD_WORDS) - intent.vocabulary:
+            return None
+
+        # Unknown words may narrow or change the query (e.g. "among fintech companies")
+        if words - intent.vocabulary - CHART_WORDS.keys() - STOPWORDS:
+            return None
+
+        visualization_type = intent.visualization_type
+        if requested_types:
+            (requested_type,) = requested_types
+            if requested_type not in (intent.visualization_type, *intent.alternate_types):
+                return None
+            visualization_type = requested_type
+
+        return {
+            "intent": intent.name,
+            "visualization_type": visualization_type,
+            "title": intent.title,
+            "sql": intent.sql,
+            "chart_config": dict(intent.chart_config),
+        }
+
+
+DEFAULT_INTENTS = [
+    Intent(
+        name="industry_breakdown",
+        keywords=(
+            frozenset({"industry", "industries", "sector", "sectors"}),
+            frozenset(
+                {
+                    "breakdown",
+                    "distribution",
+                    "split",
+                    "share",
+                    "mix",
+                    "composition",
+                    "proportion",
+                    "proportions",
+                    "pie",
+                    "count",
+                    "many",
+                }
+            ),
+        ),
+        sql=(
+            "SELECT industry, COUNT(*) as count FROM companies "
+            "GROUP BY industry ORDER BY count DESC"
+        ),
+        visualization_type="pie",
+        alternate_types=("bar",),
+        title="Industry Breakdown",
+        chart_config={"x_field": "industry", "y_field": "count", "colors": [], "chart_style": ""},
+    ),
+    Intent(
+        name="founded_year_vs_valuation",
+        keywords=(
+            frozenset({"founded", "founding", "year", "years", "age"}),
+            frozenset({"valuation", "valuations", "valued"}),
+        ),
+        sql=(
+            "SELECT founded_year, valuation_usd FROM companies "
+            "WHERE valuation_usd > 0 ORDER BY founded_year"
+        ),
+        visualization_type="scatter",
+        title="Founded Year vs Valuation",
+        chart_config={"x_field": "founded_year", "y_field": "valuation_usd"},
+    ),
+    Intent(
+        name="investor_frequency",
+        keywords=(
+            frozenset({"investor", "investors", "backers", "vc", "vcs"}),
+            frozenset(
+                {
+                    "frequent",
+                    "frequently",
+                    "frequency",
+                    "most",
+                    "top",
+                    "common",
+                    "often",
+                    "popular",
+                    "active",
+                    "appear",
+                    "ranking",
+                }
+            ),
+        ),
+        sql=(
+            "SELECT investors.name as investor, COUNT(*) as frequency "
+            "FROM company_investors JOIN investors ON investors.id = company_investors.investor_id "
+            "GROUP BY company_investors.investor_id "
+            "HAVING frequency > 1 ORDER BY frequency DESC LIMIT 15"
+        ),
+        visualization_type="bar",
+        title="Most Frequent Investors",
+        chart_config={
+            "x_field": "investor",
+            "y_field": "frequency",
+            "colors": [],
+            "chart_style": "",
+        },
+    ),
+    Intent(
+        name="arr_vs_valuation",
+        keywords=(
+            frozenset({"arr", "revenue", "recurring"}),
+            frozenset({"valuation", "valuations", "valued"}),
+        ),
+        sql=(
+            "SELECT arr_usd, valuation_usd FROM companies "
+            "WHERE arr_usd > 0 AND valuation_usd > 0 ORDER BY arr_usd"
+        ),
+        visualization_type="scatter",
+        title="ARR vs Valuation Correlation",
+        chart_config={"x_field": "arr_usd", "y_field": "valuation_usd"},
+    ),
+    Intent(
+        name="product_frequency",
+        keywords=(
+            frozenset({"product", "products"}),
+            frozenset({"frequent", "frequently", "most", "top", "common", "often", "popular"}),
+        ),
+        sql=(
+            "SELECT products.name as product, COUNT(*) as companies "
+            "FROM company_products JOIN products ON products.id = company_products.product_id "
+            "GROUP BY company_products.product_id ORDER BY companies DESC LIMIT 15"
+        ),
+        visualization_type="bar",
+        alternate_types=("pie",),
+        title="Most Common Products",
+        chart_config={
+            "x_field": "product",
+            "y_field": "companies",
+            "colors": [],
+            "chart_style": "",
+        },
+    ),
+]
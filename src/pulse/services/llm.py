@@ -1,24 +1,261 @@
 """LLM service for natural language to SQL and visualization generation"""
 
+import asyncio
 import json
 import logging
+import re
+import time
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import asynccontextmanager, contextmanager, nullcontext
 from typing import Any
 
 import anthropic
 from sqlalchemy import text
-
-from ..database.session import get_async_session
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from .. import server_timing
+from ..database.session import get_analytics_session, get_async_session
+from ..metrics import (
+    llm_plans,
+    llm_rows_returned,
+    llm_sql_repairs,
+    llm_stage_duration,
+    sql_cost_guard_actions,
+)
 from ..settings import settings
+from .cache import TTLCache, normalize_prompt
+from .data_versions import data_version_service
+from .intents import DEFAULT_INTENTS, IntentMatcher
+from .query_cost import PlanStep, QueryCost, estimate_cost
+from .results import DataFormat, QueryRows, format_data
+from .singleflight import SingleFlight
+from .sql_validator import SQLValidationError, SQLValidator, table_aliases, with_limit
+from .styling import parse_style_instruction
 
 
 logger = logging.getLogger("pulse.llm")
 
 
+def extract_json_object(response_text: str) -> dict[str, Any]:
+    """Parse the first JSON object in a model response, ignoring any surrounding text"""
+    decoder = json.JSONDecoder()
+    start = response_text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(response_text, start)
+        except json.JSONDecodeError:
+            value = None
+        if isinstance(value, dict):
+            return value
+        start = response_text.find("{", start + 1)
+
+    raise ValueError(f"Invalid JSON response from LLM: {response_text}")
+
+
+def find_string_field(partial_json: str, field: str) -> str | None:
+    """Return a string field from possibly incomplete JSON once its value is complete"""
+    match = re.search(rf'"{re.escape(field)}"\s*:\s*"', partial_json)
+    if match is None:
+        return None
+    try:
+        # Decode from the opening quote; an unterminated string raises
+        value, _ = json.JSONDecoder().raw_decode(partial_json, match.end() - 1)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, str) else None
+
+
+@contextmanager
+def _stage(stage: str) -> Iterator[None]:
+    """Time a pipeline stage into the stage histogram and the request's Server-Timing"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(stage, time.perf_counter() - start)
+
+
+def _record_stage(stage: str, seconds: float) -> None:
+    """Record a measured stage duration"""
+    llm_stage_duration.observe(seconds, stage=stage)
+    server_timing.record(stage, seconds)
+
+
+def _build_result(plan: dict[str, Any], data: QueryRows) -> dict[str, Any]:
+    return {
+        "success": True,
+        "visualization_type": plan["visualization_type"],
+        "title": plan["title"],
+        "sql": plan["sql"],
+        "data": data,
+        "truncated": getattr(data, "truncated", False),
+        "chart_config": dict(plan["chart_config"]),
+    }
+
+
+def _repair_messages(
+    user_prompt: str, llm_response: dict[str, Any], error: str
+) -> list[dict[str, Any]]:
+    """Conversation asking the model to fix the SQL of its previous answer"""
+    return [
+        {"role": "user", "content": user_prompt},
+        {"role": "assistant", "content": json.dumps(llm_response)},
+        {
+            "role": "user",
+            "content": (
+                f"That SQL failed in SQLite: {error}\n"
+                "Return the complete JSON again with the SQL fixed."
+            ),
+        },
+    ]
+
+
+# SQLite messages for statements that fail to prepare because of the SQL itself
+PREPARE_ERRORS = (
+    "no such column",
+    "no such table",
+    "no such function",
+    "syntax error",
+    "ambiguous column",
+)
+
+
+def _is_prepare_error(error: DBAPIError) -> bool:
+    """Whether SQLite rejected the statement for a reason the model can fix"""
+    message = str(error.orig).lower()
+    return isinstance(error, OperationalError) and any(
+        reason in message for reason in PREPARE_ERRORS
+    )
+
+
+def _failed_to_prepare(task: asyncio.Task[Any]) -> bool:
+    """Whether a finished query task failed because SQLite could not prepare its SQL"""
+    if not task.done() or task.cancelled():
+        return False
+    error = task.exception()
+    return isinstance(error, DBAPIError) and _is_prepare_error(error)
+
+
+def _error_result(error: Exception) -> dict[str, Any]:
+    return {
+        "success": False,
+        "error": str(error),
+        "visualization_type": "error",
+        "title": "Visualization Error",
+        "data": [],
+        "sql": "",
+    }
+
+
+def _row_events(data: QueryRows) -> list[dict[str, Any]]:
+    """Split query results into ``rows`` stream events"""
+    chunk_size = settings.stream_rows_chunk_size
+    return [
+        {"event": "rows", "offset": offset, "rows": data[offset : offset + chunk_size]}
+        for offset in range(0, len(data), chunk_size)
+    ]
+
+
+class LLMCapacityError(RuntimeError):
+    """Raised when no LLM slot frees up within the configured queue limits"""
+
+
+class ConcurrencyLimiter:
+    """Bound in-flight LLM calls with a limited wait queue"""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[None, None]:
+        """Hold one concurrency slot for the duration of the block"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise LLMCapacityError(
+                "The visualization service is busy. Please try again in a moment."
+            )
+
+        self.waiting += 1
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+        except TimeoutError as err:
+            raise LLMCapacityError(
+                "Timed out waiting for the visualization service. Please try again."
+            ) from err
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+class SQLBudgetError(ValueError):
+    """Raised when a generated query exceeds its execution budget"""
+
+
+# SQLite VM instructions between progress handler calls
+PROGRESS_HANDLER_INTERVAL = 10_000
+
+
+class ExecutionBudget:
+    """SQLite progress handler that interrupts a query past its time or VM-step limit"""
+
+    def __init__(self, timeout: float, max_steps: int):
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.deadline = time.monotonic() + timeout if timeout > 0 else None
+        self.steps = 0
+        self.exceeded: str | None = None
+
+    def __call__(self) -> int:
+        # Runs on the database thread; a non-zero return aborts the statement
+        self.steps += PROGRESS_HANDLER_INTERVAL
+        if self.max_steps and self.steps > self.max_steps:
+            self.exceeded = f"more than {self.max_steps:,} steps"
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.exceeded = f"more than {self.timeout:g}s"
+        return 1 if self.exceeded else 0
+
+
 class LLMService:
     """Service for processing natural language queries into SQL and visualizations"""
 
     def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        self.client = anthropic.AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            timeout=settings.llm_timeout_seconds,
+            max_retries=settings.llm_max_retries,
+        )
+        self.limiter = ConcurrencyLimiter(
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue=settings.llm_max_queue,
+            queue_timeout=settings.llm_queue_timeout_seconds,
+        )
+        # Queries the cost guard marks as heavy share a few slots so they cannot
+        # occupy the whole analytics pool
+        self.heavy_queries = asyncio.Semaphore(settings.sql_heavy_concurrency)
+        self._table_stats: tuple[float, dict[str, int]] | None = None
+        self.intents = IntentMatcher(DEFAULT_INTENTS)
+        self.inflight: SingleFlight[tuple[dict[str, Any], dict[str, float]]] = SingleFlight()
+        self.plan_cache = TTLCache(
+            max_entries=settings.plan_cache_max_entries,
+            max_bytes=settings.plan_cache_max_bytes,
+            ttl_seconds=settings.plan_cache_ttl_seconds,
+        )
+        self.result_cache = TTLCache(
+            max_entries=settings.result_cache_max_entries,
+            max_bytes=settings.result_cache_max_bytes,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+        )
         self.db_schema = {
             "table_name": "companies",
             "columns": {
@@ -43,28 +280,93 @@ class LLMService:
                 "created_at": "DATETIME NOT NULL",
                 "updated_at": "DATETIME NOT NULL",
             },
+            # Indexed mirrors of the JSON arrays, one row per company/investor or product
+            "related_tables": {
+                "investors": {
+                    "id": "INTEGER PRIMARY KEY",
+                    "name": "VARCHAR(255) NOT NULL UNIQUE - Investor name",
+                },
+                "company_investors": {
+                    "company_id": "INTEGER NOT NULL - References companies.id",
+                    "investor_id": "INTEGER NOT NULL - References investors.id (indexed)",
+                    "position": "INTEGER NOT NULL - Position in the company's top_investors",
+                },
+                "products": {
+                    "id": "INTEGER PRIMARY KEY",
+                    "name": "VARCHAR(255) NOT NULL UNIQUE - Product name",
+                },
+                "company_products": {
+                    "company_id": "INTEGER NOT NULL - References companies.id",
+                    "product_id": "INTEGER NOT NULL - References products.id (indexed)",
+                    "position": "INTEGER NOT NULL - Position in the company's product list",
+                },
+            },
+        }
+
+        # Tables and columns generated SQL may read
+        self.sql_validator = SQLValidator(
+            {
+                self.db_schema["table_name"]: set(self.db_schema["columns"]),
+                **{
+                    name: set(columns) for name, columns in self.db_schema["related_tables"].items()
+                },
+            }
+        )
+
+        # The system prompt is identical on every call: build it once and let the
+        # provider cache it, so repeat calls only pay for the user turn
+        self.system_prompt = self._build_system_prompt()
+        self.system_blocks: list[dict[str, Any]] = [{"type": "text", "text": self.system_prompt}]
+        if settings.llm_prompt_caching:
+            self.system_blocks[0]["cache_control"] = {"type": "ephemeral"}
+
+        self.usage = {
+            "requests": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
         }
 
-    async def process_query(self, user_prompt: str) -> dict[str, Any]:
-        """Process natural language query and return visualization config + data"""
+    async def process_query(
+        self, user_prompt: str, data_format: DataFormat = "rows"
+    ) -> dict[str, Any]:
+        """Process natural language query and return visualization config + data
+
+        Concurrent calls for the same normalized prompt share a single execution; the
+        data is shaped per caller as rows or columns (see format_data).
+        """
+        result, timings = await self.inflight.do(
+            normalize_prompt(user_prompt),
+            lambda: server_timing.capture(self._process_query(user_prompt)),
+        )
+        # Every caller, including coalesced ones, reports the shared call's stages
+        server_timing.merge(timings)
+        result = {**result, "data": format_data(result["data"], data_format)}
+        if "chart_config" in result:
+            result["chart_config"] = dict(result["chart_config"])
+        return result
+
+    async def _process_query(self, user_prompt: str) -> dict[str, Any]:
+        """Resolve a plan (intent, plan cache or model) and fetch its data"""
         try:
-            # Get SQL and visualization config from LLM
-            llm_response = await self._get_llm_response(user_prompt)
+            plan = self._get_local_plan(user_prompt)
+            plan_is_new = plan is None
+            steps = None
 
-            # Validate and sanitize SQL
-            sql_query = self._sanitize_sql(llm_response.get("sql", ""))
+            if plan is None:
+                # Get SQL and visualization config from LLM
+                llm_plans.inc(source="model")
+                llm_response = await self._get_llm_response(user_prompt)
+                plan, steps = await self._plan_from_response(user_prompt, llm_response)
 
             # Execute SQL and get data
-            data = await self._execute_sql(sql_query)
+            data = await self._get_data(plan["sql"], steps)
 
-            return {
-                "success": True,
-                "visualization_type": llm_response.get("visualization_type", "table"),
-                "title": llm_response.get("title", "Visualization"),
-                "sql": sql_query,
-                "data": data,
-                "chart_config": llm_response.get("chart_config", {}),
-            }
+            if plan_is_new and settings.plan_cache_enabled:
+                self.plan_cache.set(normalize_prompt(user_prompt), plan)
+
+            return _build_result(plan, data)
 
         except Exception as e:
             # Log the error with context
@@ -77,18 +379,185 @@ class LLMService:
                 },
             )
 
+            return _error_result(e)
+
+    async def stream_query(self, user_prompt: str) -> AsyncGenerator[dict[str, Any], None]:
+        """Process a query, yielding an event as each pipeline stage completes
+
+        Events: ``started``, ``model_started``, ``sql_ready``, ``sql_validated``, ``rows``
+        (in chunks), then ``done`` with the visualization config, or ``error``. When the
+        model is called, the SQL starts executing as soon as its ``sql`` field has
+        streamed in, while the rest of the response is still arriving. If that SQL fails
+        to prepare, it is repaired once the response is complete; ``reset`` tells the
+        client to discard rows already sent for SQL that a repair replaced.
+        """
+        execution: asyncio.Task[QueryRows] | None = None
+        steps: list[PlanStep] | None = None
+        sql_query = ""
+        rows_sent = False
+        try:
+            yield {"event": "started"}
+
+            plan = self._get_local_plan(user_prompt)
+            plan_is_new = plan is None
+
+            if plan is None:
+                yield {"event": "model_started"}
+                llm_plans.inc(source="model")
+                response_text = ""
+                model_started = time.perf_counter()
+                async with (
+                    self.limiter.slot(),
+                    self.client.messages.stream(
+                        model=settings.llm_model,
+                        max_tokens=settings.llm_max_tokens,
+                        system=self.system_blocks,
+                        messages=[{"role": "user", "content": user_prompt}],
+                    ) as stream,
+                ):
+                    async for text in stream.text_stream:
+                        response_text += text
+
+                        if not sql_query:
+                            streamed_sql = find_string_field(response_text, "sql")
+                            if streamed_sql is not None:
+                                yield {"event": "sql_ready", "sql": streamed_sql}
+                                sql_query = streamed_sql
+                                try:
+                                    sql_query = self._sanitize_sql(streamed_sql)
+                                except SQLValidationError as e:
+                                    # Repairable queries are fixed once the response is complete
+                                    if not e.repairable:
+                                        raise
+                                else:
+                                    yield {"event": "sql_validated", "sql": sql_query}
+                                    execution = asyncio.create_task(self._get_data(sql_query))
+
+                        if execution is not None and execution.done() and not rows_sent:
+                            if _failed_to_prepare(execution):
+                                # Left for _plan_from_response to repair with the full response
+                                execution = None
+                            else:
+                                for event in _row_events(execution.result()):
+                                    yield event
+                                rows_sent = True
+
+                    self._record_usage((await stream.get_final_message()).usage)
+                _record_stage("llm", time.perf_counter() - model_started)
+
+                with _stage("parse"):
+                    llm_response = extract_json_object(response_text)
+                plan, steps = await self._plan_from_response(user_prompt, llm_response)
+                if execution is not None and sql_query != plan["sql"]:
+                    # Repaired SQL replaces the speculative execution
+                    if execution.done() and not execution.cancelled():
+                        execution.exception()  # Retrieved so a failure is not reported
+                    execution.cancel()
+                    execution = None
+                    if rows_sent:
+                        yield {"event": "reset"}
+                        rows_sent = False
+                if execution is None:
+                    yield {"event": "sql_validated", "sql": plan["sql"]}
+            else:
+                yield {"event": "sql_ready", "sql": plan["sql"]}
+                yield {"event": "sql_validated", "sql": plan["sql"]}
+
+            if execution is None:
+                execution = asyncio.create_task(self._get_data(plan["sql"], steps))
+            data = await execution
+
+            if not rows_sent:
+                for event in _row_events(data):
+                    yield event
+
+            if plan_is_new and settings.plan_cache_enabled:
+                self.plan_cache.set(normalize_prompt(user_prompt), plan)
+
+            result = _build_result(plan, data)
+            del result["data"]
+            yield {"event": "done", "row_count": len(data), **result}
+
+        except Exception as e:
+            logger.error(
+                "Streaming query processing failed",
+                extra={
+                    "user_prompt": user_prompt,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                },
+            )
+            yield {"event": "error", **_error_result(e)}
+
+        finally:
+            if execution is not None and not execution.done():
+                execution.cancel()
+
+    async def modify_visualization(
+        self, existing: dict[str, Any], instruction: str, data_format: DataFormat = "rows"
+    ) -> dict[str, Any]:
+        """Restyle an existing visualization, keeping its SQL and data
+
+        Instructions made only of known styling vocabulary are applied locally. Anything
+        else asks the model for a new chart config, but the existing rows are still
+        reused rather than re-running the query.
+        """
+        try:
+            visualization_type = existing.get("visualization_type", "table")
+            title = existing.get("title", "Visualization")
+            chart_config = dict(existing.get("chart_config") or {})
+
+            style_patch = parse_style_instruction(instruction, visualization_type)
+            if style_patch is not None:
+                logger.debug("Applied styling locally", extra={"patch": style_patch})
+                chart_config.update(style_patch)
+            else:
+                context_prompt = (
+                    "EXISTING VISUALIZATION:\n"
+                    f"Type: {visualization_type}\n"
+                    f"Title: {title}\n"
+                    f"SQL: {existing.get('sql', '')}\n"
+                    f"Current Config: {json.dumps(chart_config)}\n\n"
+                    f"MODIFICATION REQUEST: {instruction}\n\n"
+                    "Please modify the visualization based on the request. Keep the same SQL "
+                    "and data, only change styling/formatting."
+                )
+                llm_response = await self._get_llm_response(context_prompt)
+                visualization_type = llm_response.get("visualization_type") or visualization_type
+                title = llm_response.get("title") or title
+                chart_config.update(llm_response.get("chart_config") or {})
+
+            # Only touch the database when the client didn't send the rows back
+            sql_query = existing.get("sql", "")
+            data = existing.get("data")
+            if data is None:
+                sql_query = self._sanitize_sql(sql_query)
+                data = await self._get_data(sql_query)
+
             return {
-                "success": False,
-                "error": str(e),
-                "visualization_type": "error",
-                "title": "Visualization Error",
-                "data": [],
-                "sql": "",
+                "success": True,
+                "visualization_type": visualization_type,
+                "title": title,
+                "sql": sql_query,
+                "data": format_data(data, data_format),
+                "chart_config": chart_config,
             }
 
-    async def _get_llm_response(self, user_prompt: str) -> dict[str, Any]:
-        """Get structured response from LLM"""
-        system_prompt = f"""
+        except Exception as e:
+            logger.error(
+                "Visualization modification failed",
+                extra={
+                    "instruction": instruction,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                },
+            )
+
+            return _error_result(e)
+
+    def _build_system_prompt(self) -> str:
+        """System prompt describing the schema, SQL rules, styling and response format"""
+        return f"""
 You are a data visualization expert for the Top 100 SaaS Companies/Startups 2025 dataset.
 You MUST handle these 4 REQUIRED visualization types:
 
@@ -106,22 +575,28 @@ Database Schema - Top 100 SaaS Companies 2025:
 Table: {self.db_schema["table_name"]}
 Columns: {json.dumps(self.db_schema["columns"], indent=2)}
 
-JSON FIELD QUERIES:
-The top_investors and product fields are JSON arrays. Use SQLite JSON functions:
+Related tables: {json.dumps(self.db_schema["related_tables"], indent=2)}
+
+INVESTOR AND PRODUCT QUERIES:
+The top_investors and product JSON arrays are mirrored into indexed link tables.
+PREFER the link tables over parsing JSON - they use indexes instead of scanning every array.
 
 For investor frequency analysis:
-- Use json_each() to extract individual investors: json_each(top_investors)
-- Example: SELECT json_each.value as investor, COUNT(*) as count FROM companies, json_each(top_investors) GROUP BY investor
+- Join company_investors to investors and group by company_investors.investor_id
+- Example: SELECT investors.name as investor, COUNT(*) as frequency FROM company_investors JOIN investors ON investors.id = company_investors.investor_id GROUP BY company_investors.investor_id ORDER BY frequency DESC
 
 For product analysis:
-- Use json_each() to extract individual products: json_each(product)
-- Example: SELECT json_each.value as product, COUNT(*) as companies FROM companies, json_each(product) GROUP BY product
+- Join company_products to products and group by company_products.product_id
+- Example: SELECT products.name as product, COUNT(*) as companies FROM company_products JOIN products ON products.id = company_products.product_id GROUP BY company_products.product_id ORDER BY companies DESC
 
 For filtering by specific investor/product:
-- Use JSON functions: WHERE json_extract(top_investors, '$') LIKE '%Sequoia%'
+- Example: SELECT companies.company_name, companies.valuation_usd FROM companies JOIN company_investors ON company_investors.company_id = companies.id JOIN investors ON investors.id = company_investors.investor_id WHERE investors.name = 'Sequoia'
 - Show only investors that appear multiple times
 - Use bar chart visualization to show investor frequency ranking
 
+SQLite JSON functions (json_each, json_array_length) still work on top_investors and product
+for anything the link tables don't cover, e.g. json_array_length(top_investors).
+
 VISUALIZATION TYPES: pie, bar, scatter, line
 IMPORTANT: NO table visualizations allowed - use bar charts instead for tabular data
 
@@ -168,10 +643,10 @@ REQUIRED EXAMPLES - MUST SUPPORT THESE:
 
 1. Industry breakdown (pie):
 {{
-  "sql": "SELECT industry, COUNT(*) as company_count FROM companies GROUP BY industry ORDER BY company_count DESC",
+  "sql": "SELECT industry, COUNT(*) as count FROM companies GROUP BY industry ORDER BY count DESC",
   "visualization_type": "pie",
   "title": "Industry Breakdown",
-  "chart_config": {{"x_field": "industry", "y_field": "company_count", "colors": [], "chart_style": ""}}
+  "chart_config": {{"x_field": "industry", "y_field": "count", "colors": [], "chart_style": ""}}
 }}
 
 2. Founded year vs valuation (scatter):
@@ -182,9 +657,9 @@ REQUIRED EXAMPLES - MUST SUPPORT THESE:
   "chart_config": {{"x_field": "founded_year", "y_field": "valuation_usd"}}
 }}
 
-3. Most frequent investors (bar) - Show investor frequency using JSON functions:
+3. Most frequent investors (bar) - Show investor frequency using the investor link table:
 {{
-  "sql": "SELECT json_each.value as investor, COUNT(*) as frequency FROM companies, json_each(top_investors) GROUP BY investor HAVING frequency > 1 ORDER BY frequency DESC LIMIT 15",
+  "sql": "SELECT investors.name as investor, COUNT(*) as frequency FROM company_investors JOIN investors ON investors.id = company_investors.investor_id GROUP BY company_investors.investor_id HAVING frequency > 1 ORDER BY frequency DESC LIMIT 15",
   "visualization_type": "bar",
   "title": "Most Frequent Investors",
   "chart_config": {{"x_field": "investor", "y_field": "frequency", "colors": [], "chart_style": ""}}
@@ -201,120 +676,292 @@ REQUIRED EXAMPLES - MUST SUPPORT THESE:
 REMEMBER: Must support ALL 4 requirement examples. Only SELECT statements.
         """  # noqa: S608 E501
 
-        message = self.client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1000,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
-
-        response_text = message.content[0].text
+    async def _get_llm_response(
+        self, user_prompt: str, messages: list[dict[str, Any]] | None = None
+    ) -> dict[str, Any]:
+        """Get structured response from LLM, optionally continuing an earlier exchange"""
+        async with self.limiter.slot():
+            with _stage("llm"):
+                message = await self.client.messages.create(
+                    model=settings.llm_model,
+                    max_tokens=settings.llm_max_tokens,
+                    system=self.system_blocks,
+                    messages=messages or [{"role": "user", "content": user_prompt}],
+                )
 
-        # Try to extract JSON from response
-        try:
-            # Look for JSON in the response (find first complete JSON object)
-            brace_count = 0
-            start_idx = -1
-            end_idx = -1
-
-            for i, char in enumerate(response_text):
-                if char == "{":
-                    if start_idx == -1:
-                        start_idx = i
-                    brace_count += 1
-                elif char == "}":
-                    brace_count -= 1
-                    if brace_count == 0 and start_idx != -1:
-                        end_idx = i
-                        break
-
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx : end_idx + 1]
-                return json.loads(json_str)
-            else:
-                # Fallback to trying the entire response as JSON
-                return json.loads(response_text)
-        except json.JSONDecodeError as err:
-            raise ValueError(f"Invalid JSON response from LLM: {response_text}") from err
+        self._record_usage(message.usage)
+        with _stage("parse"):
+            return extract_json_object(message.content[0].text)
+
+    def _record_usage(self, usage: Any) -> None:
+        """Accumulate token counts, including prompt cache reads and writes"""
+        self.usage["requests"] += 1
+        for field in (
+            "input_tokens",
+            "output_tokens",
+            "cache_read_input_tokens",
+            "cache_creation_input_tokens",
+        ):
+            self.usage[field] += getattr(usage, field, None) or 0
+
+        logger.debug(
+            "LLM token usage",
+            extra={
+                "input_tokens": getattr(usage, "input_tokens", None),
+                "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None),
+                "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", None),
+            },
+        )
 
     def _sanitize_sql(self, sql: str) -> str:
         """Sanitize SQL query to prevent injection and ensure it's safe"""
+        with _stage("sanitize"):
+            return self._check_sql(sql)
+
+    def _check_sql(self, sql: str) -> str:
+        """Reject empty SQL or anything but a read of the known schema; return it stripped"""
         if not sql or not sql.strip():
             raise ValueError(
                 "Empty SQL query received from LLM. Please try rephrasing your request."
             )
+        return self.sql_validator.validate(sql)
+
+    def _get_local_plan(self, user_prompt: str) -> dict[str, Any] | None:
+        """Plan from the intent matcher or the plan cache, without calling the model"""
+        if settings.intent_fast_path_enabled:
+            plan = self.intents.match(user_prompt)
+            if plan is not None:
+                logger.debug("Intent fast path", extra={"intent": plan["intent"]})
+                plan["sql"] = self._sanitize_sql(plan["sql"])
+                llm_plans.inc(source="intent")
+                return plan
+
+        # Reuse the model's earlier answer for this prompt when we have one
+        if settings.plan_cache_enabled:
+            plan = self.plan_cache.get(normalize_prompt(user_prompt))
+            if plan is not None:
+                llm_plans.inc(source="plan_cache")
+            return plan
+
+        return None
+
+    def _build_plan(self, llm_response: dict[str, Any]) -> dict[str, Any]:
+        """Validate the model's answer into a visualization plan"""
+        return {
+            "visualization_type": llm_response.get("visualization_type", "table"),
+            "title": llm_response.get("title", "Visualization"),
+            "sql": self._sanitize_sql(llm_response.get("sql", "")),
+            "chart_config": llm_response.get("chart_config") or {},
+        }
 
-        sql_clean = sql.strip()
-        sql_upper = sql_clean.upper()
-
-        # Check for dangerous keywords
-        dangerous_keywords = [
-            "DROP",
-            "DELETE",
-            "INSERT",
-            "UPDATE",
-            "ALTER",
-            "CREATE",
-            "EXEC",
-            "EXECUTE",
-            "GRANT",
-            "REVOKE",
-            "TRUNCATE",
-        ]
-
-        for keyword in dangerous_keywords:
-            if keyword in sql_upper:
-                raise ValueError(
-                    f"SQL validation failed: '{keyword}' keyword not allowed. "
-                    f"Only SELECT queries are permitted. "
-                    f"Generated query: {sql_clean[:100]}{'...' if len(sql_clean) > 100 else ''}"
+    async def _plan_from_response(
+        self, user_prompt: str, llm_response: dict[str, Any]
+    ) -> tuple[dict[str, Any], list[PlanStep]]:
+        """Build a plan whose SQL validates and prepares, asking the model to repair it
+
+        When the SQL is rejected for a fixable reason or SQLite cannot prepare it, the
+        model gets one short follow-up turn with the error, up to sql_repair_attempts
+        times. Returns the plan with its query plan steps, for the cost guard to reuse.
+        """
+        for attempt in range(settings.sql_repair_attempts + 1):
+            try:
+                plan = self._build_plan(llm_response)
+                steps = await self._query_plan(plan["sql"])
+            except (SQLValidationError, DBAPIError) as e:
+                # Locked databases, I/O errors and denied statements can't be fixed
+                # by rewriting the SQL, so only prepare failures go back to the model
+                repairable = _is_prepare_error(e) if isinstance(e, DBAPIError) else e.repairable
+                if not repairable or attempt == settings.sql_repair_attempts:
+                    if attempt:
+                        llm_sql_repairs.inc(outcome="failed")
+                    raise
+                error = str(e.orig) if isinstance(e, DBAPIError) else str(e)
+                logger.debug("Repairing generated SQL", extra={"error": error})
+                llm_response = await self._get_llm_response(
+                    user_prompt, messages=_repair_messages(user_prompt, llm_response, error)
                 )
-
-        # Must start with SELECT
-        if not sql_upper.startswith("SELECT"):
-            raise ValueError(
-                f"SQL validation failed: Query must start with 'SELECT'. "
-                f"Found: '{sql_clean.split()[0] if sql_clean.split() else 'empty'}'. "
-                f"Please try rephrasing your request to focus on data retrieval."
+            else:
+                if attempt:
+                    llm_sql_repairs.inc(outcome="repaired")
+                return plan, steps
+
+        raise AssertionError("unreachable")
+
+    async def _query_plan(self, sql: str) -> list[PlanStep]:
+        """EXPLAIN QUERY PLAN rows for SQL, prepared on the read-only engine
+
+        Raises the database error when SQLite cannot prepare the statement (unknown
+        column, bad function, syntax), without running the query.
+        """
+        async with get_analytics_session() as session:
+            with _stage("prepare"):
+                result = await session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+                return [PlanStep(row[0], row[1], row[-1]) for row in result.fetchall()]
+
+    async def _table_rows(self) -> dict[str, int]:
+        """Row counts of the readable tables, from sqlite_stat1 when the data is analyzed"""
+        now = time.monotonic()
+        if self._table_stats is not None and (
+            now - self._table_stats[0] < settings.sql_table_stats_ttl_seconds
+        ):
+            return self._table_stats[1]
+
+        tables = set(self.sql_validator.tables)
+        rows: dict[str, int] = {}
+        async with get_analytics_session() as session:
+            try:
+                result = await session.execute(text("SELECT tbl, stat FROM sqlite_stat1"))
+                for table, stat in result.all():
+                    if table in tables:
+                        rows[table] = int(stat.split()[0])
+            except OperationalError:
+                pass  # Never analyzed; count the rows instead
+            for table in tables - rows.keys():
+                count = await session.execute(text(f"SELECT count(*) FROM {table}"))  # noqa: S608
+                rows[table] = count.scalar_one()
+
+        self._table_stats = (now, rows)
+        return rows
+
+    async def _guard_cost(
+        self, sql: str, steps: list[PlanStep] | None = None
+    ) -> tuple[str, list[PlanStep], QueryCost]:
+        """Estimate a query's cost from its plan and apply the cost thresholds
+
+        Queries above sql_cost_reject_rows are rejected, and those above
+        sql_cost_limit_rows without a LIMIT get one at the row cap so SQLite can stop
+        early. The plan is prepared here unless the caller already has it. Returns the
+        SQL to run with its plan and estimate.
+        """
+        if steps is None:
+            steps = await self._query_plan(sql)
+        table_rows = await self._table_rows()
+        cost = estimate_cost(steps, table_rows, table_aliases(sql, set(table_rows)))
+
+        if cost.rows > settings.sql_cost_reject_rows:
+            sql_cost_guard_actions.inc(action="reject")
+            logger.warning(
+                "Query rejected by cost guard",
+                extra={"sql": sql, "plan": [step.detail for step in steps], **cost.as_dict()},
+            )
+            raise SQLBudgetError(
+                f"This query would read about {cost.rows:,.0f} rows, more than the allowed "
+                f"{settings.sql_cost_reject_rows:,}. Try a narrower question or add filters."
             )
 
-        # Check for prohibited clauses/patterns
-        prohibited_patterns = [
-            ("WITH ", "CTE/WITH clauses"),
-            ("CREATE ", "table creation"),
-            ("INTO ", "INSERT INTO or SELECT INTO"),
-        ]
-
-        for pattern, description in prohibited_patterns:
-            if pattern in sql_upper:
-                raise ValueError(
-                    f"SQL validation failed: {description} not allowed. "
-                    f"Use simple SELECT statements only. "
-                    f"Generated query: {sql_clean[:100]}{'...' if len(sql_clean) > 100 else ''}"
-                )
+        if cost.rows > settings.sql_cost_limit_rows and settings.sql_max_rows > 0:
+            limited = with_limit(sql, settings.sql_max_rows + 1)
+            if limited != sql:
+                sql_cost_guard_actions.inc(action="limit")
+                sql = limited
 
-        # Basic SQL injection prevention
-        dangerous_chars = [";", "--", "/*", "*/"]
-        for char in dangerous_chars:
-            if char in sql_clean:
-                if not (
-                    char == ";" and sql_clean.count(";") == 1 and sql_clean.rstrip().endswith(";")
-                ):
-                    raise ValueError(
-                        f"SQL validation failed: Unsafe character sequence '{char}' detected. "
-                        f"Please try a simpler query format."
-                    )
+        return sql, steps, cost
 
-        return sql_clean
+    async def _get_data(self, sql: str, steps: list[PlanStep] | None = None) -> QueryRows:
+        """Get query results, reusing cached rows until the companies data changes"""
+        if not settings.result_cache_enabled:
+            return await self._execute_sql(sql, steps)
 
-    async def _execute_sql(self, sql: str) -> list[dict[str, Any]]:
-        """Execute SQL query and return results"""
-        async with get_async_session() as session:
-            result = await session.execute(text(sql))
-            columns = result.keys()
-            rows = result.fetchall()
+        data_version = await self._get_data_version()
+        data = self.result_cache.get(sql, version=data_version)
+        if data is not None:
+            logger.debug("Result cache hit", extra={"sql": sql})
+            return data
 
-            return [{col: row[i] for i, col in enumerate(columns)} for row in rows]
+        data = await self._execute_sql(sql, steps)
+        self.result_cache.set(sql, data, version=data_version)
+        return data
+
+    async def _get_data_version(self) -> int:
+        """Current version of the companies data, used to invalidate cached results"""
+        async with get_async_session() as session:
+            return await data_version_service.get_version(session, "companies")
+
+    async def _execute_sql(self, sql: str, steps: list[PlanStep] | None = None) -> QueryRows:
+        """Execute SQL query within the cost guard and execution budget
+
+        The query plan (steps, when already prepared) is checked first (see
+        _guard_cost); queries estimated above sql_cost_heavy_rows wait for one of the
+        few heavy-query slots. Queries slower than sql_slow_query_seconds are logged
+        with their plan.
+        """
+        cost: QueryCost | None = None
+        heavy = False
+        if settings.sql_cost_guard_enabled:
+            sql, steps, cost = await self._guard_cost(sql, steps)
+            heavy = cost.rows > settings.sql_cost_heavy_rows
+            if heavy:
+                sql_cost_guard_actions.inc(action="heavy")
+
+        started = time.perf_counter()
+        async with self.heavy_queries if heavy else nullcontext():
+            data = await self._run_sql(sql)
+        elapsed = time.perf_counter() - started
+
+        if elapsed > settings.sql_slow_query_seconds:
+            if steps is None:
+                steps = await self._query_plan(sql)
+            logger.warning(
+                "Slow query",
+                extra={
+                    "sql": sql,
+                    "seconds": round(elapsed, 3),
+                    "heavy": heavy,
+                    "plan": [step.detail for step in steps],
+                    **(cost.as_dict() if cost is not None else {}),
+                },
+            )
+        return data
+
+    async def _run_sql(self, sql: str) -> QueryRows:
+        """Run SQL on the read-only engine within the execution budget
+
+        The query is interrupted once it runs past sql_timeout_seconds or
+        sql_max_vm_steps, and at most sql_max_rows rows are fetched; the returned rows
+        are flagged as truncated when more were available.
+        """
+        max_rows = settings.sql_max_rows
+        async with get_analytics_session() as session:
+            connection = await session.connection()
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            assert driver_connection is not None  # Only None once the connection is invalidated
+            budget = None
+            if (settings.sql_timeout_seconds > 0 or settings.sql_max_vm_steps > 0) and hasattr(
+                driver_connection, "set_progress_handler"
+            ):
+                budget = ExecutionBudget(settings.sql_timeout_seconds, settings.sql_max_vm_steps)
+                await driver_connection.set_progress_handler(budget, PROGRESS_HANDLER_INTERVAL)
+
+            try:
+                with _stage("sql"):
+                    # Stream so only the rows we keep are fetched from the cursor
+                    result = await session.stream(text(sql))
+                    columns = list(result.keys())
+                    if max_rows > 0:
+                        rows = await result.fetchmany(max_rows + 1)
+                    else:
+                        rows = await result.fetchall()
+                    await result.close()
+            except OperationalError as e:
+                if budget is not None and budget.exceeded:
+                    raise SQLBudgetError(
+                        f"Query stopped after {budget.exceeded}. "
+                        "Try a narrower question or add filters."
+                    ) from e
+                raise
+            finally:
+                if budget is not None:
+                    await driver_connection.set_progress_handler(None, 0)
+
+        # Rows stay tuples under one header; row dicts are only built when needed
+        data = QueryRows(columns, [tuple(row) for row in rows])
+        if max_rows > 0 and len(data) > max_rows:
+            del data.rows[max_rows:]
+            data.truncated = True
+            logger.warning("Query result truncated", extra={"sql": sql, "max_rows": max_rows})
+
+        llm_rows_returned.observe(len(data))
+        return data
 
 
 # Global service instance
@@ -0,0 +1,95 @@
+"""Query result containers and the response shapes built from them
+
+Visualization rows are kept as tuples under one header instead of a dict per row.
+Responses use either the ``rows`` shape (a list of row objects, the default) or the
+``columnar`` shape, ``{"columns": [...], "values": {column: [...]}}``, which names
+each column once and is several times smaller for large charts.
+"""
+
+from collections.abc import Iterator, Sequence
+from typing import Any, Literal
+
+
+DataFormat = Literal["rows", "columnar"]
+
+
+class QueryRows(Sequence[dict[str, Any]]):
+    """Rows of a visualization query, stored as tuples under a single header
+
+    Indexing and iteration give row dicts, so it reads like a list of records;
+    columnar() builds the compact shape without them. truncated is set when the row
+    cap cut the rows short.
+    """
+
+    def __init__(
+        self, columns: Sequence[str], rows: list[tuple[Any, ...]], truncated: bool = False
+    ):
+        self.columns = list(columns)
+        self.rows = rows
+        self.truncated = truncated
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [dict(zip(self.columns, row, strict=True)) for row in self.rows[index]]
+        return dict(zip(self.columns, self.rows[index], strict=True))
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for row in self.rows:
+            yield dict(zip(self.columns, row, strict=True))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, QueryRows):
+            return (self.columns, self.rows) == (other.columns, other.rows)
+        if isinstance(other, list):
+            return self.records() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"QueryRows(columns={self.columns!r}, rows={len(self.rows)})"
+
+    def records(self) -> list[dict[str, Any]]:
+        """Rows as a list of dicts keyed by column"""
+        return list(self)
+
+    def columnar(self) -> dict[str, Any]:
+        """Columns once, with each column's values in row order"""
+        values = list(zip(*self.rows, strict=True)) or [()] * len(self.columns)
+        return {
+            "columns": list(self.columns),
+            "values": {
+                column: list(column_values)
+                for column, column_values in zip(self.columns, values, strict=True)
+            },
+        }
+
+
+def format_data(data: Any, data_format: DataFormat = "rows") -> Any:
+    """Shape visualization data as a list of rows or as columns
+
+    Accepts QueryRows, a list of row dicts, or data already in the columnar shape
+    (e.g. sent back by a client), and returns the requested shape.
+    """
+    if isinstance(data, QueryRows):
+        return data.columnar() if data_format == "columnar" else data.records()
+
+    if isinstance(data, dict) and "columns" in data and "values" in data:
+        if data_format == "columnar":
+            return data
+        columns = data["columns"]
+        return [
+            dict(zip(columns, row, strict=True))
+            for row in zip(*(data["values"][column] for column in columns), strict=True)
+        ]
+
+    if data_format == "columnar":
+        columns = list(dict.fromkeys(key for row in data for key in row))
+        return {
+            "columns": columns,
+            "values": {column: [row.get(column) for row in data] for column in columns},
+        }
+    return data
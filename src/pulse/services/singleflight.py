@@ -0,0 +1,35 @@
+"""Request coalescing for identical concurrent calls"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Generic, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time and share its outcome with every caller
+
+    The call runs in its own task, so a caller that goes away (e.g. a client disconnect
+    cancelling its request) does not cancel the work other callers are waiting on.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: dict[str, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await the in-flight call for key, starting it with fn if there is none"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
@@ -0,0 +1,470 @@
+"""Tokenizer-based validation for generated SQL
+
+Queries are split into SQL tokens, so keywords inside identifiers (``updated_at``),
+string literals or quoted names no longer trip the checks. A query passes when it is
+a single SELECT (optionally introduced by WITH) that only references known tables
+and their columns. Results are cached per whitespace-normalized query.
+"""
+
+import re
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<name>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<param>[?:@$][A-Za-z0-9_]*)
+    | (?P<op>\|\||->>|->|<=|>=|<>|!=|==|<<|>>|[-+*/%<>=~&|(),.;])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Statements and clauses that never belong in a read-only query
+FORBIDDEN_KEYWORDS = frozenset(
+    {
+        "ALTER",
+        "ANALYZE",
+        "ATTACH",
+        "CREATE",
+        "DELETE",
+        "DETACH",
+        "DROP",
+        "EXEC",
+        "EXECUTE",
+        "GRANT",
+        "INSERT",
+        "INTO",
+        "PRAGMA",
+        "REINDEX",
+        "REPLACE",  # Still allowed as the replace() function
+        "REVOKE",
+        "TRUNCATE",
+        "UPDATE",
+        "VACUUM",
+    }
+)
+
+# Words that can appear in a SELECT without naming a column
+KEYWORDS = frozenset(
+    {
+        "ALL",
+        "AND",
+        "AS",
+        "ASC",
+        "BETWEEN",
+        "BINARY",
+        "BY",
+        "CASE",
+        "CAST",
+        "COLLATE",
+        "CROSS",
+        "CURRENT",
+        "CURRENT_DATE",
+        "CURRENT_TIME",
+        "CURRENT_TIMESTAMP",
+        "DESC",
+        "DISTINCT",
+        "ELSE",
+        "END",
+        "ESCAPE",
+        "EXCEPT",
+        "EXCLUDE",
+        "EXISTS",
+        "FALSE",
+        "FILTER",
+        "FIRST",
+        "FOLLOWING",
+        "FROM",
+        "FULL",
+        "GLOB",
+        "GROUP",
+        "GROUPS",
+        "HAVING",
+        "IN",
+        "INDEXED",
+        "INNER",
+        "INTERSECT",
+        "IS",
+        "ISNULL",
+        "JOIN",
+        "LAST",
+        "LEFT",
+        "LIKE",
+        "LIMIT",
+        "MATCH",
+        "MATERIALIZED",
+        "NATURAL",
+        "NOCASE",
+        "NOT",
+        "NOTNULL",
+        "NULL",
+        "NULLS",
+        "OFFSET",
+        "ON",
+        "OR",
+        "ORDER",
+        "OTHERS",
+        "OUTER",
+        "OVER",
+        "PARTITION",
+        "PRECEDING",
+        "RANGE",
+        "RECURSIVE",
+        "REGEXP",
+        "RIGHT",
+        "ROW",
+        "ROWS",
+        "RTRIM",
+        "SELECT",
+        "THEN",
+        "TIES",
+        "TRUE",
+        "UNBOUNDED",
+        "UNION",
+        "USING",
+        "VALUES",
+        "WHEN",
+        "WHERE",
+        "WINDOW",
+        "WITH",
+        # Type names used in CAST
+        "BIGINT",
+        "BLOB",
+        "BOOLEAN",
+        "CHAR",
+        "DATE",
+        "DATETIME",
+        "DECIMAL",
+        "DOUBLE",
+        "FLOAT",
+        "INT",
+        "INTEGER",
+        "NUMERIC",
+        "REAL",
+        "TEXT",
+        "VARCHAR",
+    }
+)
+
+# Keywords that end the table list of a FROM clause
+_FROM_TERMINATORS = frozenset(
+    {"WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "UNION", "INTERSECT", "EXCEPT", "WINDOW"}
+)
+
+# Keywords after which a bare name is still an expression rather than an alias
+_ALIAS_AFTER_KEYWORDS = frozenset({"END", "NULL", "TRUE", "FALSE"})
+
+# Table-valued functions a query may read from, with their columns
+TABLE_FUNCTIONS: dict[str, frozenset[str]] = {
+    name: frozenset(
+        {"key", "value", "type", "atom", "id", "parent", "fullkey", "path", "json", "root"}
+    )
+    for name in ("json_each", "json_tree")
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Token:
+    kind: str
+    value: str
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper()
+
+    def is_op(self, value: str) -> bool:
+        return self.kind == "op" and self.value == value
+
+    def is_keyword(self, *keywords: str) -> bool:
+        return self.kind == "name" and self.upper in keywords
+
+
+def _scan(sql: str) -> Iterator[tuple[Token, int]]:
+    """Every token of SQL, whitespace and comments included, with its end offset"""
+    position = 0
+    while position < len(sql):
+        match = _TOKEN_RE.match(sql, position)
+        if match is None:
+            raise ValueError(f"unexpected character {sql[position]!r} at position {position}")
+        kind = match.lastgroup
+        assert kind is not None  # Every alternative of _TOKEN_RE is a named group
+        position = match.end()
+        yield Token(kind, match.group()), position
+
+
+def tokenize(sql: str) -> list[Token]:
+    """Split SQL into tokens, dropping whitespace and comments"""
+    return [token for token, _ in _scan(sql) if token.kind not in ("space", "comment")]
+
+
+def _identifier(token: Token) -> str:
+    """Lowercased identifier name with any quoting removed"""
+    if token.kind == "quoted":
+        return token.value[1:-1].lower()
+    return token.value.lower()
+
+
+class SQLValidationError(ValueError):
+    """Raised for rejected SQL
+
+    repairable is set for mistakes the model can fix by rewriting the same read
+    (syntax, unknown tables or columns), not for queries that try to write.
+    """
+
+    def __init__(self, message: str, repairable: bool = False):
+        super().__init__(message)
+        self.repairable = repairable
+
+
+class SQLValidator:
+    """Validate generated SQL against a fixed schema of readable tables"""
+
+    def __init__(self, tables: Mapping[str, set[str] | frozenset[str]], cache_size: int = 1024):
+        self.tables = {
+            name.lower(): {"rowid", *(column.lower() for column in columns)}
+            for name, columns in tables.items()
+        }
+        # Cache by normalized SQL; rejections are cached as their error message
+        self._find_error = lru_cache(maxsize=cache_size)(self._check)
+
+    def validate(self, sql: str) -> str:
+        """Return the stripped query, or raise SQLValidationError explaining the rejection"""
+        sql_clean = sql.strip()
+        error = self._find_error(" ".join(sql_clean.split()))
+        if error:
+            message, repairable = error
+            raise SQLValidationError(f"SQL validation failed: {message}", repairable)
+        return sql_clean
+
+    def cache_info(self) -> Any:
+        """Hit and miss counts of the validation cache"""
+        return self._find_error.cache_info()
+
+    def _check(self, sql: str) -> tuple[str, bool] | None:
+        """Error message and whether it is repairable, or None when the query is allowed"""
+        try:
+            tokens = tokenize(sql)
+        except ValueError as e:
+            return str(e), True
+
+        # A single statement, optionally terminated by one semicolon
+        if tokens and tokens[-1].is_op(";"):
+            tokens = tokens[:-1]
+        if any(token.is_op(";") for token in tokens):
+            return "only a single statement is allowed", False
+        if not tokens or not tokens[0].is_keyword("SELECT", "WITH"):
+            found = tokens[0].value if tokens else "empty"
+            return (
+                f"query must start with 'SELECT' or 'WITH'. Found: '{found}'. "
+                "Please try rephrasing your request to focus on data retrieval.",
+                False,
+            )
+
+        for i, token in enumerate(tokens):
+            if token.kind == "name" and token.upper in FORBIDDEN_KEYWORDS:
+                if token.upper == "REPLACE" and _next(tokens, i).is_op("("):
+                    continue
+                return f"'{token.upper}' not allowed. Only SELECT queries are permitted.", False
+
+        depth = 0
+        for token in tokens:
+            depth += token.is_op("(") - token.is_op(")")
+            if depth < 0:
+                return "unbalanced parentheses", True
+        if depth:
+            return "unbalanced parentheses", True
+
+        error = self._check_references(tokens)
+        return (error, True) if error else None
+
+    def _check_references(self, tokens: list[Token]) -> str | None:
+        """Check that tables and columns exist in the schema"""
+        ctes = _cte_names(tokens)
+        sources: dict[str, str | None] = {}  # Table or alias -> known table it reads
+        definitions: set[int] = set()  # Token positions naming tables or aliases
+        aliases: set[str] = set()
+        columns: set[str] = set()
+
+        in_from: set[int] = set()
+        expect_table = False
+        depth = 0
+        for i, token in enumerate(tokens):
+            if token.is_op("("):
+                depth += 1
+                if expect_table:  # Subquery in FROM
+                    expect_table = False
+                continue
+            if token.is_op(")"):
+                in_from.discard(depth)
+                depth -= 1
+                continue
+            if token.is_keyword("FROM", "JOIN"):
+                in_from.add(depth)
+                expect_table = True
+                continue
+            if token.is_op(",") and depth in in_from:
+                expect_table = True
+                continue
+            if token.is_keyword(*_FROM_TERMINATORS):
+                in_from.discard(depth)
+                continue
+
+            if expect_table and token.kind in ("name", "quoted"):
+                expect_table = False
+                name = _identifier(token)
+                definitions.add(i)
+                if _next(tokens, i).is_op("."):
+                    return f"schema-qualified table '{name}' not allowed"
+                if _next(tokens, i).is_op("("):
+                    if name not in TABLE_FUNCTIONS:
+                        return f"table function '{name}' not allowed"
+                    sources[name] = name
+                    columns |= TABLE_FUNCTIONS[name]
+                    alias = _alias_at(tokens, _closing(tokens, i + 1) + 1)
+                    if alias is not None:
+                        definitions.add(alias)
+                        sources[_identifier(tokens[alias])] = name
+                    continue
+                if name in ctes:
+                    sources[name] = None
+                elif name in self.tables:
+                    sources[name] = name
+                    columns |= self.tables[name]
+                else:
+                    return f"unknown table '{name}'"
+                alias = _alias_at(tokens, i + 1)
+                if alias is not None:
+                    definitions.add(alias)
+                    sources[_identifier(tokens[alias])] = sources[name]
+                continue
+
+            # Column aliases: "expr AS alias" and "expr alias"
+            if token.kind in ("name", "quoted") and not token.is_keyword(*KEYWORDS):
+                previous = tokens[i - 1] if i else None
+                if previous is not None and (
+                    previous.is_keyword("AS")
+                    or previous.is_op(")")
+                    or previous.kind in ("number", "string", "quoted")
+                    or (
+                        previous.kind == "name"
+                        and (
+                            previous.upper in _ALIAS_AFTER_KEYWORDS
+                            or previous.upper not in KEYWORDS
+                        )
+                    )
+                ):
+                    aliases.add(_identifier(token))
+                    definitions.add(i)
+                    # A bare alias after a subquery can qualify columns
+                    sources.setdefault(_identifier(token), None)
+
+        for i, token in enumerate(tokens):
+            if token.kind != "name" or i in definitions:
+                continue
+            name = token.value.lower()
+            following = _next(tokens, i)
+
+            if following.is_op("."):
+                column = tokens[i + 2] if i + 2 < len(tokens) else None
+                if name not in sources and name not in ctes:
+                    return f"unknown table or alias '{name}'"
+                source = sources.get(name)
+                if column is None or column.is_op("*") or source is None:
+                    continue
+                known = self.tables.get(source) or TABLE_FUNCTIONS.get(source, frozenset())
+                if _identifier(column) not in known:
+                    return f"unknown column '{source}.{_identifier(column)}'"
+                continue
+            if i and tokens[i - 1].is_op("."):
+                continue  # Checked with its qualifier
+            if following.is_op("(") or token.upper in KEYWORDS:
+                continue  # Function call or keyword
+            if name in columns or name in aliases or name in ctes or name in sources:
+                continue
+            return f"unknown column '{name}'"
+
+        return None
+
+
+def _next(tokens: list[Token], i: int) -> Token:
+    return tokens[i + 1] if i + 1 < len(tokens) else Token("end", "")
+
+
+def _closing(tokens: list[Token], i: int) -> int:
+    """Position of the parenthesis closing the one at position i"""
+    depth = 0
+    for j in range(i, len(tokens)):
+        depth += tokens[j].is_op("(") - tokens[j].is_op(")")
+        if depth == 0:
+            return j
+    return len(tokens) - 1
+
+
+def _alias_at(tokens: list[Token], i: int) -> int | None:
+    """Position of the alias following a table reference, if any"""
+    if i < len(tokens) and tokens[i].is_keyword("AS"):
+        i += 1
+    if i < len(tokens) and tokens[i].kind in ("name", "quoted"):
+        if not tokens[i].is_keyword(*KEYWORDS):
+            return i
+    return None
+
+
+def _cte_names(tokens: list[Token]) -> set[str]:
+    """Names (and declared column names) introduced by a WITH clause"""
+    names: set[str] = set()
+    for i, token in enumerate(tokens):
+        if token.kind not in ("name", "quoted") or token.is_keyword(*KEYWORDS):
+            continue
+        if not i or not (tokens[i - 1].is_keyword("WITH", "RECURSIVE") or tokens[i - 1].is_op(",")):
+            continue
+        # name AS (   or   name (col, ...) AS (
+        end = _closing(tokens, i + 1) if _next(tokens, i).is_op("(") else i
+        if _next(tokens, end).is_keyword("AS") and _next(tokens, end + 1).is_op("("):
+            names.add(_identifier(token))
+            names.update(
+                _identifier(column)
+                for column in tokens[i + 2 : end]
+                if column.kind in ("name", "quoted")
+            )
+    return names
+
+
+def table_aliases(sql: str, tables: set[str] | frozenset[str]) -> dict[str, str]:
+    """Map each name a query uses for one of the given tables to the table"""
+    tokens = tokenize(sql)
+    aliases = {table: table for table in tables}
+    for i, token in enumerate(tokens):
+        if token.kind not in ("name", "quoted") or _identifier(token) not in tables:
+            continue
+        alias = _alias_at(tokens, i + 1)
+        if alias is not None:
+            aliases[_identifier(tokens[alias])] = _identifier(token)
+    return aliases
+
+
+def with_limit(sql: str, limit: int) -> str:
+    """The query with a LIMIT added, unless its outermost SELECT already has one
+
+    Trailing comments and semicolons are dropped so a ``-- comment`` can't swallow
+    the added clause.
+    """
+    depth = 0
+    content_end = 0
+    for token, end in _scan(sql):
+        if token.kind in ("space", "comment"):
+            continue
+        depth += token.is_op("(") - token.is_op(")")
+        if depth == 0 and token.is_keyword("LIMIT"):
+            return sql
+        if not token.is_op(";"):
+            content_end = end
+    return f"{sql[:content_end]} LIMIT {int(limit)}"
@@ -0,0 +1,206 @@
+"""Local parsing of chart styling instructions
+
+Covers the styling vocabulary the model is told about (colors, themes, legend position,
+font size/weight, title style) so "make it light blue" style requests can patch
+chart_config directly. Instructions containing anything else return None and are
+escalated to the LLM.
+"""
+
+import re
+from typing import Any
+
+
+# Keep in sync with the color map in apps/dashboard/src/components/VisualizationChart.tsx
+COLOR_NAMES = {
+    "light_blue": "#87CEEB",
+    "blue": "#36A2EB",
+    "red": "#FF6384",
+    "green": "#4BC0C0",
+    "yellow": "#FFCE56",
+    "purple": "#9966FF",
+    "orange": "#FF9F40",
+    "pink": "#FFB6C1",
+    "gray": "#C9CBCF",
+    "grey": "#C9CBCF",
+}
+
+COLOR_THEMES = frozenset({"pastel", "vibrant", "corporate"})
+
+LEGEND_POSITIONS = frozenset({"top", "bottom", "left", "right"})
+
+# chart_config fields a color can be applied to by naming the element first
+COLOR_TARGETS = frozenset({"background_color", "border_color", "grid_color"})
+
+# Words that select which chart_config field the following values apply to
+TARGET_WORDS = {
+    "background": "background_color",
+    "border": "border_color",
+    "borders": "border_color",
+    "outline": "border_color",
+    "grid": "grid_color",
+    "gridlines": "grid_color",
+    "title": "title",
+    "heading": "title",
+    "legend": "legend",
+    "font": "font",
+    "fonts": "font",
+    "text": "font",
+    "labels": "font",
+}
+
+SIZE_WORDS = {
+    "large": "large",
+    "larger": "large",
+    "big": "large",
+    "bigger": "large",
+    "small": "small",
+    "smaller": "small",
+}
+
+RESET_WORDS = frozenset(
+    {"default", "multi", "multicolor", "multicolored", "colorful", "varied", "different"}
+)
+
+FILLER_WORDS = frozenset(
+    {
+        "a",
+        "all",
+        "an",
+        "and",
+        "apply",
+        "as",
+        "at",
+        "be",
+        "bars",
+        "can",
+        "change",
+        "chart",
+        "color",
+        "colors",
+        "colour",
+        "colours",
+        "dots",
+        "for",
+        "graph",
+        "header",
+        "i",
+        "in",
+        "instead",
+        "into",
+        "it",
+        "its",
+        "like",
+        "lines",
+        "look",
+        "make",
+        "me",
+        "move",
+        "of",
+        "on",
+        "palette",
+        "please",
+        "plot",
+        "points",
+        "position",
+        "put",
+        "row",
+        "scheme",
+        "set",
+        "should",
+        "size",
+        "slices",
+        "style",
+        "table",
+        "the",
+        "theme",
+        "them",
+        "this",
+        "to",
+        "turn",
+        "use",
+        "weight",
+        "with",
+        "would",
+        "you",
+    }
+)
+
+# Bare numbers and other digit tokens are kept so unrecognised values reject the instruction
+_TOKEN_RE = re.compile(r"#[0-9a-f]{6}\b|#[0-9a-f]{3}\b|\d+px\b|\d\w*|[a-z_]+")
+_HEX_RE = re.compile(r"#(?:[0-9a-f]{3}|[0-9a-f]{6})")
+
+
+def parse_style_instruction(
+    instruction: str, visualization_type: str = ""
+) -> dict[str, Any] | None:
+    """Translate a styling instruction into a chart_config patch
+
+    Returns None when any part of the instruction is not understood, so callers can
+    fall back to the LLM instead of silently dropping part of the request.
+    """
+    text = re.sub(r"\blight[\s-]+blue\b", "light_blue", instruction.lower())
+    text = re.sub(r"\bmulti[\s-]+colou?r(ed)?\b", "multicolor", text).replace("colour", "color")
+
+    patch: dict[str, Any] = {}
+    colors: list[str] = []
+    target = ""
+    untargeted_value = False
+
+    for token in _TOKEN_RE.findall(text):
+        if token in TARGET_WORDS:
+            # A target after a value ("use #ff0000 for the border") may have been meant
+            # for that value, which was already applied to the series
+            if untargeted_value:
+                return None
+            target = TARGET_WORDS[token]
+            continue
+
+        if token in FILLER_WORDS or token == visualization_type:
+            continue
+
+        if not target:
+            untargeted_value = True
+
+        updates: dict[str, Any] = {}
+        if token in COLOR_NAMES or _HEX_RE.fullmatch(token):
+            color = COLOR_NAMES.get(token, token.upper())
+            if target in COLOR_TARGETS:
+                updates[target] = color
+            elif target:
+                # Title, legend and font colors are not supported by chart_config
+                return None
+            else:
+                colors.append(color)
+        elif token in COLOR_THEMES:
+            updates = {"chart_style": token, "colors": []}
+        elif token in RESET_WORDS:
+            updates = {"chart_style": "", "colors": []}
+        elif token in LEGEND_POSITIONS and target == "legend":
+            updates["legend_position"] = token
+        elif token in ("bold", "italic"):
+            if target == "title" or token == "italic":
+                updates["title_style"] = token
+            else:
+                updates["font_weight"] = token
+        elif token in ("normal", "regular", "unbold"):
+            updates["font_weight"] = "normal"
+        elif token in SIZE_WORDS:
+            if target == "title":
+                updates["title_style"] = SIZE_WORDS[token]
+            else:
+                updates["font_size"] = SIZE_WORDS[token]
+        elif token.endswith("px") and token[:-2].isdigit():
+            updates["font_size"] = token
+        else:
+            return None
+
+        # Each field holds one value; "bold and italic" can't both be applied
+        for key, value in updates.items():
+            if patch.setdefault(key, value) != value:
+                return None
+
+    if colors:
+        patch["colors"] = colors
+        patch["chart_style"] = ""
+
+    return patch or None
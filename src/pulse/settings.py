@@ -1,5 +1,7 @@
 """Application settings for Pulse"""
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,6 +21,26 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite+aiosqlite:///./pulse.db"
+    db_echo: bool = False  # Log every SQL statement (independent of debug)
+
+    # Connection pool for the read/write engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+
+    # SQLite pragmas applied to every connection
+    db_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    db_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    db_mmap_size: int = 128 * 1024 * 1024  # Bytes of the file to memory-map
+    db_cache_size_kib: int = 16 * 1024  # Page cache per connection
+    db_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    db_busy_timeout_ms: int = 5_000  # Wait this long for a lock instead of failing
+
+    # Read-only pool for generated analytics SQL
+    analytics_pool_size: int = 8
+    analytics_pool_timeout_seconds: float = 10.0
+    analytics_mmap_size: int = 256 * 1024 * 1024  # Bytes of the file to memory-map
+    analytics_cache_size_kib: int = 64 * 1024  # Page cache per connection
 
     # Authentication
     secret_key: str = "change-this-secret-key-in-production"
@@ -31,12 +53,64 @@ class Settings(BaseSettings):
     cors_allow_methods: list[str] = ["*"]
     cors_allow_headers: list[str] = ["*"]
 
+    # Request tracing
+    trust_request_id_header: bool = False  # Reuse an inbound X-Request-ID (behind a trusted proxy)
+
     # Logging
     log_level: str = "INFO"  # DEBUG|INFO|WARNING|ERROR
     json_logs: bool = True
+    log_queue_enabled: bool = False  # Render and write logs on a background thread
+    log_queue_size: int = 10_000  # Records buffered for the writer thread
+    log_queue_block: bool = False  # When the queue is full: wait (True) or drop and count (False)
+    log_sample_rates: dict[str, float] = {}  # Fraction of debug/info events kept, by logger name
+
+    # Metrics
+    metrics_enabled: bool = True  # Serve /metrics
+    metrics_multiprocess_dir: str = ""  # Shared snapshot dir when running several workers
+    metrics_flush_interval_seconds: float = 5.0  # How often each worker writes its snapshot
 
     # Anthropic API
     anthropic_api_key: str = ""
+    llm_model: str = "claude-3-5-sonnet-20241022"
+    llm_max_tokens: int = 1000
+    llm_timeout_seconds: float = 30.0  # Per-call timeout for a single model request
+    llm_max_retries: int = 2
+    llm_prompt_caching: bool = True  # Mark the static system prompt for provider-side caching
+    llm_max_concurrency: int = 32  # Model calls in flight per worker
+    llm_max_queue: int = 64  # Calls allowed to wait for a free slot before rejecting
+    llm_queue_timeout_seconds: float = 10.0
+
+    # Execution budget for generated SQL (0 disables a limit)
+    sql_timeout_seconds: float = 5.0
+    sql_max_vm_steps: int = 50_000_000  # SQLite VM instructions
+    sql_max_rows: int = 5_000  # Extra rows are cut and the response flagged truncated
+    # Cost guard: estimated rows visited, from EXPLAIN QUERY PLAN and table sizes
+    sql_cost_guard_enabled: bool = True
+    sql_cost_limit_rows: int = 100_000  # Above this, add a LIMIT at the row cap
+    sql_cost_heavy_rows: int = 1_000_000  # Above this, run in the heavy-query lane
+    sql_cost_reject_rows: int = 100_000_000  # Above this, reject the query
+    sql_heavy_concurrency: int = 2  # Heavy queries running at once (per worker)
+    sql_table_stats_ttl_seconds: float = 60.0  # How long table sizes are reused
+    sql_slow_query_seconds: float = 1.0  # Log the plan of queries slower than this
+    # Follow-up turns asking the model to fix SQL that fails validation or EXPLAIN
+    sql_repair_attempts: int = 1
+
+    # Rows per "rows" event on the streaming endpoint
+    stream_rows_chunk_size: int = 500
+
+    # Answer recognised prompts (see services/intents.py) without calling the model
+    intent_fast_path_enabled: bool = True
+
+    # Visualization caches: model output keyed on the normalized prompt survives data
+    # reloads; query results keyed on the SQL text are dropped when the data changes
+    plan_cache_enabled: bool = True
+    plan_cache_ttl_seconds: float = 24 * 60 * 60.0
+    plan_cache_max_entries: int = 1024
+    plan_cache_max_bytes: int = 8 * 1024 * 1024
+    result_cache_enabled: bool = True
+    result_cache_ttl_seconds: float = 300.0
+    result_cache_max_entries: int = 256
+    result_cache_max_bytes: int = 32 * 1024 * 1024
 
 
 class GlobalSettings(BaseSettings):
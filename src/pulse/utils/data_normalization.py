@@ -3,6 +3,28 @@ Utility functions for normalizing data from CSV files
 """
 
 import re
+from collections.abc import Callable, Iterable
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+# Compiled once; these run for every cell of every ingested row
+_NULL_VALUES = frozenset({"N/A", "NA", "", "NULL"})
+_CURRENCY_STRIP_RE = re.compile(r"[\$,\s]")
+_PARENTHESIZED_RE = re.compile(r"\([^)]*\)")
+_AMOUNT_RE = re.compile(r"(\d+\.?\d*)([KMBTQ]?)")
+_NON_NUMERIC_RE = re.compile(r"[^\d.]")
+_EMPLOYEE_STRIP_RE = re.compile(r"[,\s]")
+
+_MULTIPLIERS = {
+    "K": 1_000,
+    "M": 1_000_000,
+    "B": 1_000_000_000,
+    "T": 1_000_000_000_000,
+    "Q": 1_000_000_000_000_000,  # Quadrillion (just in case)
+    "": 1,  # No suffix
+}
 
 
 def parse_currency_to_float(value: str) -> int:
@@ -23,20 +45,23 @@ def parse_currency_to_float(value: str) -> int:
     Returns:
         Integer value in USD (0 if unparseable)
     """
-    if not value or value.upper() in ["N/A", "NA", "", "NULL"]:
+    if not value:
+        return 0
+    upper_value = value.upper()
+    if upper_value in _NULL_VALUES:
         return 0
 
     # Remove currency symbols and spaces, but keep the value part before any parentheses
-    clean_value = re.sub(r"[\$,\s]", "", value.upper())
+    clean_value = _CURRENCY_STRIP_RE.sub("", upper_value)
     # Remove anything in parentheses (like "(Salesforce)", "(Adobe)")
-    clean_value = re.sub(r"\([^)]*\)", "", clean_value)
+    clean_value = _PARENTHESIZED_RE.sub("", clean_value)
 
     # Extract number and suffix
-    match = re.match(r"^(\d+\.?\d*)([KMBTQ]?)$", clean_value)
+    match = _AMOUNT_RE.fullmatch(clean_value)
     if not match:
         # Try to parse as plain number
         try:
-            return round(float(re.sub(r"[^\d.]", "", value)))
+            return round(float(_NON_NUMERIC_RE.sub("", value)))
         except (ValueError, TypeError):
             return 0
 
@@ -47,17 +72,7 @@ def parse_currency_to_float(value: str) -> int:
         return 0
 
     # Apply multiplier based on suffix
-    multipliers = {
-        "K": 1_000,
-        "M": 1_000_000,
-        "B": 1_000_000_000,
-        "T": 1_000_000_000_000,
-        "Q": 1_000_000_000_000_000,  # Quadrillion (just in case)
-        "": 1,  # No suffix
-    }
-
-    multiplier = multipliers.get(suffix, 1)
-    result = number * multiplier
+    result = number * _MULTIPLIERS.get(suffix, 1)
 
     # Round to whole number to avoid floating point precision issues
     # For large financial numbers, fractional cents are not meaningful
@@ -74,11 +89,11 @@ def parse_employee_count(value: str) -> int | None:
     Returns:
         Integer employee count or None if unparseable
     """
-    if not value or value.upper() in ["N/A", "NA", "", "NULL"]:
+    if not value or value.upper() in _NULL_VALUES:
         return None
 
     # Remove commas and spaces
-    clean_value = re.sub(r"[,\s]", "", value)
+    clean_value = _EMPLOYEE_STRIP_RE.sub("", value)
 
     try:
         return int(clean_value)
@@ -86,6 +101,52 @@ def parse_employee_count(value: str) -> int | None:
         return None
 
 
+def _parse_column(values: Iterable[str], parse: Callable[[str], T]) -> list[T]:
+    """Apply a scalar parser to a column, parsing each distinct cell value once"""
+    parsed: dict[str, T] = {}
+    result: list[T] = []
+    append = result.append
+    for value in values:
+        try:
+            append(parsed[value])
+        except KeyError:
+            parsed[value] = parse(value)
+            append(parsed[value])
+    return result
+
+
+def parse_currency_column(values: Iterable[str]) -> list[int]:
+    """
+    Parse a whole column of currency strings in one pass.
+
+    Same per-cell results as parse_currency_to_float; repeated values (e.g. 'N/A',
+    '$1B') are parsed once per call. Accepts any iterable of strings, including
+    NumPy string arrays.
+
+    Args:
+        values: Column of string values to parse
+
+    Returns:
+        List of integer values in USD (0 where unparseable)
+    """
+    return _parse_column(values, parse_currency_to_float)
+
+
+def parse_employee_count_column(values: Iterable[str]) -> list[int | None]:
+    """
+    Parse a whole column of employee count strings in one pass.
+
+    Same per-cell results as parse_employee_count, with repeated values parsed once.
+
+    Args:
+        values: Column of string values to parse
+
+    Returns:
+        List of integer employee counts (None where unparseable)
+    """
+    return _parse_column(values, parse_employee_count)
+
+
 def format_currency_display(value: int) -> str:
     """
     Format a numeric currency value for display.
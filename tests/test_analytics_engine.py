@@ -0,0 +1,105 @@
+"""Tests for the read-only engine used to run generated SQL"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DatabaseError
+
+from pulse.database import session as db
+from pulse.database.session import (
+    _analytics_url,
+    _read_only_authorizer,
+    get_analytics_session,
+    get_async_session,
+    init_database,
+)
+from pulse.services.llm import llm_service
+from pulse.settings import settings
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    await init_database()
+
+
+def test_file_database_opens_read_only():
+    """File databases are opened through a mode=ro URI"""
+    url = _analytics_url("sqlite+aiosqlite:///./pulse.db")
+
+    assert url.database == "file:./pulse.db"
+    assert url.query == {"mode": "ro", "uri": "true"}
+    assert _analytics_url("sqlite+aiosqlite://").database is None
+
+
+async def test_read_only_without_authorizer():
+    """With the authorizer removed, mode=ro and query_only still refuse writes"""
+    async with get_analytics_session() as session:
+        connection = await session.connection()
+        raw = (await connection.get_raw_connection()).driver_connection
+        await raw.set_authorizer(None)
+        try:
+            with pytest.raises(Exception, match=r"readonly|read-only"):
+                await raw.execute("DELETE FROM companies")
+        finally:
+            await raw.set_authorizer(_read_only_authorizer)
+
+    assert db.analytics_engine is not db.engine
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "DELETE FROM companies",
+        "UPDATE companies SET company_name = 'x'",
+        "CREATE TABLE evil (id INTEGER)",
+        "PRAGMA query_only = OFF",
+        "ATTACH DATABASE ':memory:' AS other",
+    ],
+)
+async def test_authorizer_rejects_non_reads(sql):
+    """Statements other than reads fail even without the string checks"""
+    with pytest.raises(DatabaseError):
+        await llm_service._execute_sql(sql)
+
+    data = await llm_service._execute_sql("SELECT count(*) AS n FROM companies")
+    assert data[0]["n"] > 0
+
+
+async def test_reads_with_table_valued_functions():
+    """Reads that use json_each and CTEs are allowed"""
+    data = await llm_service._execute_sql(
+        'WITH names AS (SELECT value FROM json_each(\'["a", "b"]\')) '
+        "SELECT count(*) AS n FROM names"
+    )
+
+    assert data == [{"n": 2}]
+
+
+@pytest.fixture
+async def memory_database(monkeypatch):
+    names = ("engine", "async_session_factory", "analytics_engine", "analytics_session_factory")
+    previous = {name: getattr(db, name) for name in names}
+    monkeypatch.setattr(settings, "database_url", "sqlite+aiosqlite://")
+    await init_database()
+    yield
+    await db.close_database()
+    for name, value in previous.items():
+        setattr(db, name, value)
+
+
+async def test_memory_database_shares_primary_engine(memory_database):
+    """In-memory analytics sessions see the primary database but only while read-only"""
+    async with get_async_session() as session:
+        await session.execute(
+            text("INSERT INTO data_versions (table_name, version) VALUES ('t', 1)")
+        )
+        await session.commit()
+
+    assert db.analytics_engine is db.engine
+    async with get_analytics_session() as session:
+        assert (await session.execute(text("SELECT version FROM data_versions"))).scalar() == 1
+        with pytest.raises(DatabaseError):
+            await session.execute(text("DELETE FROM data_versions"))
+
+    async with get_async_session() as session:
+        await session.execute(text("DELETE FROM data_versions"))
+        await session.commit()
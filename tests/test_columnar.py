@@ -0,0 +1,144 @@
+"""Tests for query result containers and the columnar data format"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pulse.main import app
+from pulse.routes.visualizations import COLUMNAR_MEDIA_TYPE, get_data_format
+from pulse.services.cache import estimate_size
+from pulse.services.llm import llm_service
+from pulse.services.results import QueryRows, format_data
+from pulse.settings import settings
+
+
+PROMPT = "Which investors appear most frequently?"
+
+
+def test_query_rows_read_like_records():
+    """Indexing, slicing and iteration give row dicts built from the tuples"""
+    data = QueryRows(["name", "arr"], [("a", 1), ("b", 2), ("c", 3)])
+
+    assert len(data) == 3
+    assert data[0] == {"name": "a", "arr": 1}
+    assert data[1:] == [{"name": "b", "arr": 2}, {"name": "c", "arr": 3}]
+    assert [row["arr"] for row in data] == [1, 2, 3]
+    assert data == data.records()
+    assert data.truncated is False
+
+
+def test_columnar_shape():
+    """Each column is named once with its values in row order"""
+    data = QueryRows(["name", "arr"], [("a", 1), ("b", 2)])
+
+    assert data.columnar() == {
+        "columns": ["name", "arr"],
+        "values": {"name": ["a", "b"], "arr": [1, 2]},
+    }
+    assert QueryRows(["name"], []).columnar() == {"columns": ["name"], "values": {"name": []}}
+
+
+def test_format_data_round_trips():
+    """Row lists and columnar dicts convert into each other"""
+    rows = [{"name": "a", "arr": 1}, {"name": "b", "arr": 2}]
+    columnar = format_data(rows, "columnar")
+
+    assert columnar == QueryRows(["name", "arr"], [("a", 1), ("b", 2)]).columnar()
+    assert format_data(columnar, "rows") == rows
+    assert format_data(columnar, "columnar") is columnar
+    assert format_data(rows) is rows
+
+
+def test_cache_sizes_query_rows_by_content():
+    """Cached QueryRows are sized by their data, not their repr"""
+    data = QueryRows(["name"], [("x" * 100,)] * 10)
+
+    assert estimate_size(data) > 1000
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("", "rows"),
+        ("application/json", "rows"),
+        (COLUMNAR_MEDIA_TYPE, "columnar"),
+        (f"application/json, {COLUMNAR_MEDIA_TYPE.upper()}", "columnar"),
+        (f"{COLUMNAR_MEDIA_TYPE};q=0", "rows"),
+        (f"{COLUMNAR_MEDIA_TYPE}; q=0.5, application/json", "rows"),
+        (f"application/json;q=0.5, {COLUMNAR_MEDIA_TYPE}", "columnar"),
+        (f"{COLUMNAR_MEDIA_TYPE}-v2", "rows"),
+        (f"text/plain; note={COLUMNAR_MEDIA_TYPE}", "rows"),
+    ],
+)
+def test_accept_header_is_parsed(accept, expected):
+    """Accept is split into media ranges and ranked by q, not substring matched"""
+    assert get_data_format(None, accept) == expected
+    assert get_data_format("rows", accept) == "rows"
+
+
+@pytest.mark.parametrize(
+    ("params", "headers"),
+    [({"format": "columnar"}, {}), ({}, {"Accept": f"{COLUMNAR_MEDIA_TYPE}, application/json"})],
+)
+def test_generate_negotiates_columnar(monkeypatch, params, headers):
+    """The format parameter or the Accept header selects columnar data"""
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+
+    with TestClient(app) as client:
+        rows = client.post("/api/visualizations/generate", json={"prompt": PROMPT})
+        columnar = client.post(
+            "/api/visualizations/generate", json={"prompt": PROMPT}, params=params, headers=headers
+        )
+
+    assert rows.status_code == columnar.status_code == 200
+    assert "Accept" in columnar.headers["Vary"]
+    row_data = rows.json()["data"]
+    data = columnar.json()["data"]
+    assert isinstance(row_data, list)
+    assert set(data) == {"columns", "values"}
+    assert format_data(data, "rows") == row_data
+    assert len(json.dumps(data)) < len(json.dumps(row_data))
+
+
+def test_modify_returns_requested_format():
+    """Modification converts data sent back by the client into the requested shape"""
+    existing = {
+        "visualization_type": "bar",
+        "title": "ARR",
+        "sql": "SELECT company_name, arr_usd FROM companies",
+        "data": {
+            "columns": ["company_name", "arr_usd"],
+            "values": {"company_name": ["a"], "arr_usd": [1]},
+        },
+        "chart_config": {},
+    }
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/visualizations/modify",
+            json={"prompt": "make it blue", "existing_visualization": existing},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == [{"company_name": "a", "arr_usd": 1}]
+
+
+def test_modify_error_uses_requested_format(monkeypatch):
+    """A failed modification still returns empty data in the negotiated shape"""
+
+    async def fail(*args):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(llm_service, "modify_visualization", fail)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/visualizations/modify",
+            json={"prompt": "make it blue", "existing_visualization": {}},
+            params={"format": "columnar"},
+        )
+
+    assert response.status_code == 200
+    assert response.json()["success"] is False
+    assert response.json()["data"] == {"columns": [], "values": {}}
@@ -0,0 +1,156 @@
+"""Tests for keyset (cursor) pagination of the companies list"""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from pulse.database.models import Base, Company
+from pulse.main import app
+from pulse.services.companies import company_service, decode_cursor, encode_cursor
+
+
+def make_company(name: str, valuation: int, industry: str = "Software") -> Company:
+    return Company(
+        company_name=name,
+        # Same-named companies need distinct founding years (natural key)
+        founded_year=2000 + valuation // 100,
+        headquarters="San Francisco, CA",
+        industry=industry,
+        total_funding_usd=0,
+        arr_usd=0,
+        valuation_usd=valuation,
+        top_investors=[],
+        product=[],
+        g2_rating=4.5,
+    )
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        # Duplicate names and valuations exercise the id tie-breaker
+        session.add_all(
+            [
+                make_company(name, valuation, industry)
+                for name, valuation, industry in [
+                    ("Delta", 300, "Software"),
+                    ("Alpha", 100, "Fintech"),
+                    ("Charlie", 300, "Software"),
+                    ("Bravo", 200, "Software"),
+                    ("Alpha", 500, "Software"),
+                    ("Echo", 100, "Fintech"),
+                    ("Foxtrot", 400, "Software"),
+                ]
+            ]
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def walk(session, limit: int, **filters) -> list[list[int]]:
+    """Follow next_cursor until exhausted, returning the ids on each page"""
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        companies, cursor = await company_service.get_companies_page(
+            session, cursor=cursor, limit=limit, **filters
+        )
+        pages.append([company.id for company in companies])
+    return pages
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "sort", ["company_name", "-company_name", "valuation_usd", "-valuation_usd"]
+)
+async def test_pages_match_offset_listing(session, sort):
+    """Walking the cursor yields the same order as one big offset query"""
+    expected = [c.id for c in await company_service.get_companies(session, sort=sort)]
+
+    pages = await walk(session, limit=2, sort=sort)
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert [company_id for page in pages for company_id in page] == expected
+
+
+@pytest.mark.asyncio
+async def test_last_full_page_has_no_cursor(session):
+    """A page that exactly exhausts the rows does not return a cursor"""
+    companies, next_cursor = await company_service.get_companies_page(session, cursor="", limit=7)
+    assert len(companies) == 7
+    assert next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_pages_respect_filters(session):
+    """Filters apply to every page, not just the first"""
+    pages = await walk(session, limit=1, industry="Fintech")
+    assert len([company_id for page in pages for company_id in page]) == 2
+
+
+def test_cursor_round_trip():
+    """Cursors decode to the value and id they were built from"""
+    cursor = encode_cursor("-valuation_usd", 300, 42)
+    assert decode_cursor(cursor, "-valuation_usd") == (300, 42)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor("company_name", "Alpha", 1),
+        encode_cursor("valuation_usd", [1, 2], 1),
+        encode_cursor("valuation_usd", {"a": 1}, 1),
+        encode_cursor("valuation_usd", "300", 1),
+        encode_cursor("valuation_usd", True, 1),
+    ],
+)
+def test_cursor_rejects_bad_input(cursor):
+    """Garbage cursors, other sort orders and tampered sort values are rejected"""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "valuation_usd")
+
+
+class TestCompaniesEndpointPagination:
+    """Cursor mode on GET /api/companies/"""
+
+    @pytest.fixture
+    async def async_client(self):
+        from pulse.database.session import init_database
+
+        await init_database()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_cursor_mode_returns_page(self, async_client):
+        """An empty cursor starts cursor mode and returns a page envelope"""
+        response = await async_client.get("/api/companies/", params={"cursor": "", "limit": 5})
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) == 5
+        assert page["next_cursor"]
+
+        response = await async_client.get(
+            "/api/companies/", params={"cursor": page["next_cursor"], "limit": 5}
+        )
+        assert response.status_code == 200
+        offset = await async_client.get("/api/companies/", params={"skip": 5, "limit": 5})
+        assert [c["id"] for c in response.json()["items"]] == [c["id"] for c in offset.json()]
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_and_sort(self, async_client):
+        """Bad cursors and unknown sort keys are client errors"""
+        response = await async_client.get("/api/companies/", params={"cursor": "garbage"})
+        assert response.status_code == 400
+
+        tampered = encode_cursor("company_name", ["Alpha", "Beta"], 1)
+        response = await async_client.get("/api/companies/", params={"cursor": tampered})
+        assert response.status_code == 400
+
+        response = await async_client.get("/api/companies/", params={"sort": "headquarters"})
+        assert response.status_code == 400
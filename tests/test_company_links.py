@@ -0,0 +1,95 @@
+"""Tests for the normalized investor/product link tables"""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from pulse.database.models import Base, Company, CompanyInvestor, Investor, Product
+from pulse.services.companies import company_service
+
+
+def make_company(name: str, investors: list[str], products: list[str]) -> Company:
+    return Company(
+        company_name=name,
+        founded_year=2010,
+        headquarters="San Francisco, CA",
+        industry="Software",
+        total_funding_usd=0,
+        arr_usd=0,
+        valuation_usd=0,
+        top_investors=investors,
+        product=products,
+        g2_rating=4.5,
+    )
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_companies(session, *companies: Company) -> None:
+    session.add_all(companies)
+    await session.flush()
+    await company_service.sync_company_links(
+        session, [(c.id, c.top_investors, c.product) for c in companies]
+    )
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_sync_creates_shared_entities(session):
+    """Investors shared across companies are stored once"""
+    await add_companies(
+        session,
+        make_company("Acme", ["Sequoia", "Accel"], ["CRM"]),
+        make_company("Globex", ["Sequoia"], ["CRM", "Analytics"]),
+    )
+
+    investors = (await session.execute(select(Investor.name))).scalars().all()
+    products = (await session.execute(select(Product.name))).scalars().all()
+    assert sorted(investors) == ["Accel", "Sequoia"]
+    assert sorted(products) == ["Analytics", "CRM"]
+
+    links = (await session.execute(select(CompanyInvestor))).scalars().all()
+    assert len(links) == 3
+
+
+@pytest.mark.asyncio
+async def test_sync_replaces_links_and_dedupes(session):
+    """Re-syncing replaces a company's links and ignores duplicate names"""
+    acme = make_company("Acme", ["Sequoia", "Accel"], ["CRM"])
+    await add_companies(session, acme)
+
+    await company_service.sync_company_links(
+        session, [(acme.id, ["Benchmark", "Benchmark"], ["CRM"])]
+    )
+    await session.commit()
+
+    result = await session.execute(
+        select(Investor.name, CompanyInvestor.position)
+        .join(CompanyInvestor, CompanyInvestor.investor_id == Investor.id)
+        .where(CompanyInvestor.company_id == acme.id)
+    )
+    assert [tuple(row) for row in result] == [("Benchmark", 0)]
+
+
+@pytest.mark.asyncio
+async def test_get_companies_filters_by_investor(session):
+    """The investor filter goes through the link tables"""
+    await add_companies(
+        session,
+        make_company("Acme", ["Sequoia"], ["CRM"]),
+        make_company("Globex", ["Accel"], ["CRM"]),
+        make_company("Initech", ["Accel", "Sequoia"], ["CRM"]),
+    )
+
+    companies = await company_service.get_companies(session, investor="Sequoia")
+    assert [c.company_name for c in companies] == ["Acme", "Initech"]
+
+    assert await company_service.get_companies(session, investor="Nobody") == []
@@ -0,0 +1,128 @@
+"""Tests for the loader's bulk insert and upsert paths"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from pulse.database.models import Base, Company, CompanyInvestor
+from pulse.services import companies
+from pulse.services.companies import company_service, content_hash
+
+
+def make_row(name: str, founded_year: int = 2010, **overrides) -> dict:
+    row = {
+        "company_name": name,
+        "founded_year": founded_year,
+        "headquarters": "San Francisco, CA",
+        "industry": "Software",
+        "total_funding_usd": 0,
+        "arr_usd": 0,
+        "valuation_usd": 1_000,
+        "employee_count": None,
+        "top_investors": ["Sequoia"],
+        "product": ["CRM"],
+        "g2_rating": 4.5,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def test_content_hash_is_order_independent():
+    """Key order does not change the hash, values do"""
+    row = make_row("Acme")
+    assert content_hash(row) == content_hash(dict(reversed(row.items())))
+    assert content_hash(row) != content_hash(make_row("Acme", g2_rating=4.6))
+
+
+@pytest.mark.asyncio
+async def test_insert_companies_stores_hash_and_links(session):
+    """Bulk insert returns ids in input order and syncs the link tables"""
+    ids = await company_service.insert_companies(session, [make_row("Acme"), make_row("Globex")])
+    await session.commit()
+
+    names = await session.execute(select(Company.id, Company.company_name, Company.content_hash))
+    assert [(company_id, name) for company_id, name, _ in names] == list(
+        zip(ids, ["Acme", "Globex"], strict=True)
+    )
+
+    links = (await session.execute(select(CompanyInvestor))).scalars().all()
+    assert len(links) == 2
+
+
+@pytest.mark.asyncio
+async def test_upsert_counts_and_changes(session):
+    """Upsert inserts new keys, updates changed rows and skips unchanged ones"""
+    counts = await company_service.upsert_companies(
+        session, [make_row("Acme"), make_row("Globex"), make_row("Initech")]
+    )
+    await session.commit()
+    assert counts == {"inserted": 3, "updated": 0, "unchanged": 0}
+
+    # Age the rows so the update is visible in updated_at
+    await session.execute(update(Company).values(updated_at=datetime(2000, 1, 1)))
+    await session.commit()
+
+    counts = await company_service.upsert_companies(
+        session,
+        [
+            make_row("Acme"),
+            make_row("Globex", valuation_usd=2_000, top_investors=["Accel"]),
+            make_row("Initech", founded_year=2011),
+        ],
+    )
+    await session.commit()
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    session.expire_all()
+    companies = {
+        (c.company_name, c.founded_year): c
+        for c in (await session.execute(select(Company))).scalars()
+    }
+    assert len(companies) == 4
+    assert companies[("Globex", 2010)].valuation_usd == 2_000
+    assert companies[("Globex", 2010)].updated_at.year > 2000
+    assert companies[("Acme", 2010)].updated_at.year == 2000
+
+    investors = await company_service.get_companies(session, investor="Accel")
+    assert [c.company_name for c in investors] == ["Globex"]
+
+
+@pytest.mark.asyncio
+async def test_upsert_repeated_key_keeps_last_row(session):
+    """A natural key repeated within one batch is written once, with its last values"""
+    counts = await company_service.upsert_companies(
+        session, [make_row("Acme", g2_rating=3.0), make_row("Acme", g2_rating=4.0)]
+    )
+    await session.commit()
+
+    assert counts == {"inserted": 1, "updated": 0, "unchanged": 0}
+    assert (await session.execute(select(Company.g2_rating))).scalars().all() == [4.0]
+
+
+@pytest.mark.asyncio
+async def test_large_batches_split_bound_parameters(session, monkeypatch):
+    """Statements binding one parameter per row are chunked below SQLite's variable limit"""
+    monkeypatch.setattr(companies, "MAX_BOUND_PARAMETERS", 3)
+    rows = [make_row(f"Company {i}", top_investors=[f"Investor {i}", "Sequoia"]) for i in range(7)]
+
+    counts = await company_service.upsert_companies(session, rows)
+    await session.commit()
+    assert counts == {"inserted": 7, "updated": 0, "unchanged": 0}
+
+    counts = await company_service.upsert_companies(session, rows)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 7}
+
+    links = (await session.execute(select(CompanyInvestor))).scalars().all()
+    assert len(links) == 14
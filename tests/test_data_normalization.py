@@ -0,0 +1,60 @@
+"""Tests for CSV value normalization helpers"""
+
+import pytest
+
+from pulse.utils.data_normalization import (
+    parse_currency_column,
+    parse_currency_to_float,
+    parse_employee_count,
+    parse_employee_count_column,
+)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("$1B", 1_000_000_000),
+        ("$2.5M", 2_500_000),
+        ("$3T", 3_000_000_000_000),
+        ("$2K", 2_000),
+        ("$1Q", 1_000_000_000_000_000),
+        ("$1.5b", 1_500_000_000),
+        ("$65B (Salesforce)", 65_000_000_000),
+        ("1,234", 1_234),
+        ("N/A", 0),
+        ("null", 0),
+        ("", 0),
+        ("about 12 dollars", 12),
+        ("unknown", 0),
+    ],
+)
+def test_parse_currency(value, expected):
+    """Suffixes, parenthesized notes and N/A values parse as before"""
+    assert parse_currency_to_float(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("221,000", 221_000), (" 75 000 ", 75_000), ("N/A", None), ("", None), ("lots", None)],
+)
+def test_parse_employee_count(value, expected):
+    """Separators are stripped and unparseable counts become None"""
+    assert parse_employee_count(value) == expected
+
+
+def test_currency_column_matches_scalar():
+    """The column parser returns exactly the scalar results, in order"""
+    values = ["$1B", "N/A", "$2.5M", "$1B", "$65B (Salesforce)", "", "$1B", "junk"]
+    assert parse_currency_column(values) == [parse_currency_to_float(v) for v in values]
+
+
+def test_employee_column_matches_scalar():
+    """The employee column parser keeps None for unparseable cells"""
+    values = ["221,000", "N/A", "221,000", "x", "12"]
+    assert parse_employee_count_column(values) == [parse_employee_count(v) for v in values]
+
+
+def test_columns_accept_any_iterable():
+    """Generators (and other iterables such as array columns) are consumed once"""
+    assert parse_currency_column(v for v in ["$1K", "$1K"]) == [1_000, 1_000]
+    assert parse_employee_count_column(iter(())) == []
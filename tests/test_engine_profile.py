@@ -0,0 +1,56 @@
+"""Tests for the SQLite pragma profile applied to database connections"""
+
+import pytest
+from sqlalchemy import text
+
+from pulse.database import session as db
+from pulse.database.session import get_analytics_session, get_async_session, init_database
+from pulse.settings import settings
+
+
+@pytest.fixture
+async def temp_database(tmp_path, monkeypatch):
+    names = ("engine", "async_session_factory", "analytics_engine", "analytics_session_factory")
+    previous = {name: getattr(db, name) for name in names}
+    monkeypatch.setattr(settings, "database_url", f"sqlite+aiosqlite:///{tmp_path}/pulse.db")
+    await init_database()
+    yield
+    await db.close_database()
+    for name, value in previous.items():
+        setattr(db, name, value)
+
+
+async def pragma(session, name: str):
+    return (await session.execute(text(f"PRAGMA {name}"))).scalar()
+
+
+async def test_connections_use_profile(temp_database):
+    """Every read/write connection gets WAL and the configured pragmas"""
+    async with get_async_session() as session:
+        assert await pragma(session, "journal_mode") == "wal"
+        assert await pragma(session, "synchronous") == 1  # NORMAL
+        assert await pragma(session, "temp_store") == 2  # MEMORY
+        assert await pragma(session, "busy_timeout") == settings.db_busy_timeout_ms
+        assert await pragma(session, "cache_size") == -settings.db_cache_size_kib
+
+    assert db.engine.echo is settings.db_echo
+    assert db.engine.pool.size() == settings.db_pool_size
+
+
+async def test_readers_do_not_block_on_writes(temp_database):
+    """Analytics reads see the last committed state while a write is open"""
+    async with get_async_session() as writer:
+        await writer.execute(
+            text("INSERT INTO data_versions (table_name, version) VALUES ('companies', 1)")
+        )
+        await writer.flush()
+
+        async with get_analytics_session() as reader:
+            count = await reader.execute(text("SELECT count(*) FROM data_versions"))
+            assert count.scalar() == 0
+
+        await writer.commit()
+
+    async with get_analytics_session() as reader:
+        count = await reader.execute(text("SELECT count(*) FROM data_versions"))
+        assert count.scalar() == 1
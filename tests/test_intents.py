@@ -0,0 +1,137 @@
+"""Tests for the local intent fast path"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pulse.database.session import init_database
+from pulse.services.intents import DEFAULT_INTENTS, IntentMatcher
+from pulse.services.llm import LLMService
+
+
+matcher = IntentMatcher(DEFAULT_INTENTS)
+
+
+class TestIntentMatcher:
+    """Test keyword/template matching of prompts"""
+
+    @pytest.mark.parametrize(
+        ("prompt", "intent", "visualization_type"),
+        [
+            ("Create a pie chart representing industry breakdown", "industry_breakdown", "pie"),
+            ("Industry distribution as a bar chart", "industry_breakdown", "bar"),
+            (
+                "Create a scatter plot of founded year and valuation",
+                "founded_year_vs_valuation",
+                "scatter",
+            ),
+            ("Which investors appear most frequently?", "investor_frequency", "bar"),
+            (
+                "Create a table to see which investors appear most frequently",
+                "investor_frequency",
+                "bar",
+            ),
+            (
+                "Create a bar chart to see which investors appear most frequently",
+                "investor_frequency",
+                "bar",
+            ),
+            (
+                "Give me the best representation of data if I want to understand "
+                "the correlation of ARR and Valuation",
+                "arr_vs_valuation",
+                "scatter",
+            ),
+            ("Show me the most common products", "product_frequency", "bar"),
+        ],
+    )
+    def test_matches_canonical_prompts(self, prompt, intent, visualization_type):
+        plan = matcher.match(prompt)
+
+        assert plan is not None
+        assert plan["intent"] == intent
+        assert plan["visualization_type"] == visualization_type
+        assert plan["sql"].startswith("SELECT")
+
+    @pytest.mark.parametrize(
+        "prompt",
+        [
+            "Industry breakdown for companies founded after 2010",
+            "Top 5 investors",
+            "Which investors appear least frequently?",
+            "Industry breakdown by valuation",
+            "Show investor frequency as a scatter plot",
+            "Show companies with Sequoia as investor",
+            "DROP TABLE companies",
+            "",
+        ],
+    )
+    def test_falls_back_when_not_confident(self, prompt):
+        assert matcher.match(prompt) is None
+
+    @pytest.mark.parametrize(
+        "prompt",
+        [
+            "Which investors are most frequent among fintech companies?",
+            "industry breakdown for companies in San Francisco",
+            "pie chart of industry breakdown in Europe",
+            "founded year vs valuation for Sequoia-backed companies",
+            "ARR vs valuation, log scale",
+            "most common products of Microsoft",
+        ],
+    )
+    def test_filtered_prompts_fall_back(self, prompt):
+        """Words outside the intent's vocabulary may be filters, so the model decides"""
+        assert matcher.match(prompt) is None
+
+    def test_returns_independent_chart_config(self):
+        plan = matcher.match("industry breakdown")
+        plan["chart_config"]["colors"] = ["#000000"]
+
+        assert matcher.match("industry breakdown")["chart_config"]["colors"] == []
+
+
+class TestFastPath:
+    """Test that matched prompts skip the model"""
+
+    @pytest.fixture(autouse=True)
+    async def setup_database(self):
+        """Initialize database for each test"""
+        await init_database()
+
+    @pytest.mark.asyncio
+    async def test_canonical_prompt_skips_llm(self):
+        with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+            llm_service = LLMService()
+            result = await llm_service.process_query("Which investors appear most frequently?")
+
+            assert result["success"] is True
+            assert result["visualization_type"] == "bar"
+            assert result["data"][0]["investor"] == "Sequoia"
+            mock_llm.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_product_counts_are_per_product(self):
+        """Products are grouped by the individual product, not the JSON array"""
+        llm_service = LLMService()
+        result = await llm_service.process_query("Show me the most common products")
+
+        products = [row["product"] for row in result["data"]]
+        assert len(products) == len(set(products))
+        assert all(isinstance(product, str) for product in products)
+
+    @pytest.mark.asyncio
+    async def test_unmatched_prompt_uses_llm(self):
+        with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+            mock_llm.return_value = {
+                "sql": "SELECT company_name, g2_rating FROM companies ORDER BY g2_rating DESC",
+                "visualization_type": "bar",
+                "title": "G2 Ratings",
+                "chart_config": {"x_field": "company_name", "y_field": "g2_rating"},
+            }
+
+            llm_service = LLMService()
+            result = await llm_service.process_query("Which companies have the best G2 rating?")
+
+            assert result["success"] is True
+            mock_llm.assert_awaited_once()
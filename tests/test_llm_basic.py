@@ -6,6 +6,13 @@ import pytest
 
 from pulse.database.session import init_database
 from pulse.services.llm import llm_service
+from pulse.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def disable_intent_fast_path(monkeypatch):
+    """Send every prompt to the model so these tests exercise SQL generation"""
+    monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
 
 
 class TestLLMBasicFunctionality:
@@ -25,10 +32,9 @@ class TestLLMBasicFunctionality:
         assert result["visualization_type"] == "bar"
         assert "investor" in result["title"].lower()
 
-        # Verify SQL uses JSON functions
+        # Verify SQL uses the investor link table
         sql = result["sql"].lower()
-        assert "json_each" in sql
-        assert "top_investors" in sql
+        assert "company_investors" in sql
         assert "group by" in sql
 
         # Verify data structure
@@ -71,9 +77,9 @@ class TestLLMBasicFunctionality:
 
         assert result["success"] is True
 
-        # Verify SQL uses JSON functions for products
+        # Verify SQL uses the product link table
         sql = result["sql"].lower()
-        assert "json_each" in sql
+        assert "company_products" in sql
         assert "product" in sql
 
         # Verify data structure
@@ -130,8 +136,8 @@ class TestLLMBasicFunctionality:
 
         if result["success"]:
             sql = result["sql"].lower()
-            # Should use JSON functions to filter
-            assert "json_extract" in sql or "json_each" in sql
+            # Should filter through the investor link table
+            assert "company_investors" in sql
             assert "sequoia" in sql.lower()
 
 
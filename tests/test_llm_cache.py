@@ -0,0 +1,319 @@
+"""Tests for visualization plan and result caching"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pulse import server_timing
+from pulse.database.session import init_database
+from pulse.services.cache import TTLCache, normalize_prompt
+from pulse.services.llm import LLMService
+from pulse.services.singleflight import SingleFlight
+from pulse.settings import settings
+
+
+MOCK_LLM_RESPONSE = {
+    "sql": "SELECT industry, COUNT(*) as count FROM companies GROUP BY industry",
+    "visualization_type": "pie",
+    "title": "Industry Breakdown",
+    "chart_config": {"x_field": "industry", "y_field": "count"},
+}
+
+
+class TestNormalizePrompt:
+    """Test prompt normalization for cache keys"""
+
+    def test_folds_case_whitespace_and_punctuation(self):
+        assert normalize_prompt("  ARR vs.   Valuation?! ") == "arr vs valuation"
+        assert normalize_prompt("arr VS valuation") == normalize_prompt("ARR vs. valuation")
+
+    def test_keeps_comparison_operators(self):
+        assert normalize_prompt("valuation > 1B") != normalize_prompt("valuation < 1B")
+
+
+class TestTTLCache:
+    """Test TTL, LRU and version handling"""
+
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60)
+        assert cache.get("a") is None
+        cache.set("a", {"value": 1})
+        assert cache.get("a") == {"value": 1}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = TTLCache(max_entries=2, max_bytes=10_000, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_evicts_by_size(self):
+        cache = TTLCache(max_entries=10, max_bytes=50, ttl_seconds=60)
+        cache.set("a", "x" * 20)
+        cache.set("b", "y" * 20)
+        cache.set("c", "z" * 20)
+
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        assert cache.stats()["bytes"] <= 50
+
+    def test_skips_values_larger_than_budget(self):
+        cache = TTLCache(max_entries=10, max_bytes=10, ttl_seconds=60)
+        cache.set("a", "x" * 100)
+        assert len(cache) == 0
+
+    def test_expires_entries(self):
+        cache = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60)
+        cache.set("a", 1)
+        with patch("pulse.services.cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_version_mismatch_invalidates(self):
+        cache = TTLCache(max_entries=10, max_bytes=10_000, ttl_seconds=60)
+        cache.set("a", 1, version=1)
+        assert cache.get("a", version=1) == 1
+        assert cache.get("a", version=2) is None
+        assert len(cache) == 0
+
+
+class TestProcessQueryCaching:
+    """Test the plan and result caches in LLMService.process_query"""
+
+    @pytest.fixture(autouse=True)
+    async def setup_database(self, monkeypatch):
+        """Initialize database for each test and route every prompt to the (mocked) model"""
+        monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
+        await init_database()
+
+    @pytest.mark.asyncio
+    async def test_equivalent_prompts_hit_cache(self):
+        """A repeated prompt is served without calling the model or the database again"""
+        with (
+            patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_llm.return_value = MOCK_LLM_RESPONSE
+            mock_execute.return_value = [{"industry": "AI", "count": 3}]
+
+            llm_service = LLMService()
+            first = await llm_service.process_query("Industry split, please")
+            second = await llm_service.process_query("industry SPLIT please!")
+
+            assert first["success"] is True
+            assert second == first
+            assert mock_llm.await_count == 1
+            assert mock_execute.await_count == 1
+            assert llm_service.plan_cache.stats()["hits"] == 1
+            assert llm_service.result_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_chart_config_is_isolated(self):
+        """Mutating a returned chart_config does not leak into the cache"""
+        with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+            mock_llm.return_value = MOCK_LLM_RESPONSE
+
+            llm_service = LLMService()
+            first = await llm_service.process_query("industry split")
+            first["chart_config"]["colors"] = ["#000000"]
+            second = await llm_service.process_query("industry split")
+
+            assert "colors" not in second["chart_config"]
+
+    @pytest.mark.asyncio
+    async def test_data_version_bump_reruns_sql_only(self):
+        """A data reload re-executes the cached SQL without calling the model again"""
+        with (
+            patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+            patch.object(LLMService, "_get_data_version", new_callable=AsyncMock) as mock_version,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_llm.return_value = MOCK_LLM_RESPONSE
+            mock_version.return_value = 1
+            mock_execute.return_value = [{"industry": "AI", "count": 3}]
+
+            llm_service = LLMService()
+            await llm_service.process_query("industry split")
+            mock_version.return_value = 2
+            mock_execute.return_value = [{"industry": "AI", "count": 4}]
+            result = await llm_service.process_query("industry split")
+
+            assert mock_llm.await_count == 1
+            assert mock_execute.await_count == 2
+            assert result["data"] == [{"industry": "AI", "count": 4}]
+
+    @pytest.mark.asyncio
+    async def test_results_are_shared_across_prompts_with_same_sql(self):
+        """Different prompts that produce the same SQL share cached rows"""
+        with (
+            patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_llm.return_value = MOCK_LLM_RESPONSE
+            mock_execute.return_value = [{"industry": "AI", "count": 3}]
+
+            llm_service = LLMService()
+            await llm_service.process_query("industry split")
+            await llm_service.process_query("companies per industry")
+
+            assert mock_llm.await_count == 2
+            assert mock_execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        """Errors are retried on the next request instead of being cached"""
+        with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+            mock_llm.return_value = {**MOCK_LLM_RESPONSE, "sql": "DELETE FROM companies"}
+
+            llm_service = LLMService()
+            await llm_service.process_query("industry split")
+            await llm_service.process_query("industry split")
+
+            assert mock_llm.await_count == 2
+            assert len(llm_service.plan_cache) == 0
+            assert len(llm_service.result_cache) == 0
+
+
+class TestRequestCoalescing:
+    """Test singleflight deduplication of concurrent identical prompts"""
+
+    @pytest.fixture(autouse=True)
+    def disable_fast_path(self, monkeypatch):
+        """Route every prompt to the (mocked) model"""
+        monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
+
+    @pytest.mark.asyncio
+    async def test_singleflight_shares_result(self):
+        flight: SingleFlight[int] = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return 42
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+
+        assert results == [42] * 5
+        assert calls == 1
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_singleflight_propagates_errors(self):
+        flight: SingleFlight[int] = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(flight.do("key", work) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(flight) == 0
+
+    @pytest.mark.asyncio
+    async def test_singleflight_survives_cancelled_caller(self):
+        """Cancelling the first caller does not cancel the shared call"""
+        flight: SingleFlight[int] = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return 7
+
+        first = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == 7
+
+    @pytest.mark.asyncio
+    async def test_concurrent_prompts_make_one_llm_call(self):
+        """A burst of identical prompts triggers a single model call"""
+
+        async def slow_llm(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            return MOCK_LLM_RESPONSE
+
+        with (
+            patch.object(LLMService, "_get_llm_response", side_effect=slow_llm) as mock_llm,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_execute.return_value = [{"industry": "AI", "count": 3}]
+
+            llm_service = LLMService()
+            results = await asyncio.gather(
+                *(llm_service.process_query("Industry split?") for _ in range(10))
+            )
+
+            assert mock_llm.call_count == 1
+            assert mock_execute.await_count == 1
+            assert all(result["success"] for result in results)
+            assert llm_service.inflight.coalesced == 9
+
+            results[0]["chart_config"]["colors"] = ["#000000"]
+            assert "colors" not in results[1]["chart_config"]
+
+    @pytest.mark.asyncio
+    async def test_coalesced_callers_get_stage_timings(self):
+        """Callers waiting on a shared call report its stages too"""
+
+        async def slow_llm(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            server_timing.record("llm", 0.02)
+            return MOCK_LLM_RESPONSE
+
+        async def request() -> dict[str, float]:
+            token = server_timing.start_request()
+            try:
+                await llm_service.process_query("Industry split?")
+                return server_timing.current()
+            finally:
+                server_timing.end_request(token)
+
+        with (
+            patch.object(LLMService, "_get_llm_response", side_effect=slow_llm),
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_execute.return_value = [{"industry": "AI", "count": 3}]
+
+            llm_service = LLMService()
+            timings = await asyncio.gather(*(request() for _ in range(3)))
+
+            assert llm_service.inflight.coalesced == 2
+            assert all(timing["llm"] == 20.0 for timing in timings)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_prompts_share_errors(self):
+        """Every waiter receives the error from the shared call"""
+
+        async def failing_llm(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            raise ValueError("Invalid JSON response from LLM")
+
+        with patch.object(LLMService, "_get_llm_response", side_effect=failing_llm) as mock_llm:
+            llm_service = LLMService()
+            results = await asyncio.gather(
+                *(llm_service.process_query("industry split") for _ in range(5))
+            )
+
+            assert mock_llm.call_count == 1
+            assert all(result["success"] is False for result in results)
+            assert all("Invalid JSON" in result["error"] for result in results)
@@ -0,0 +1,62 @@
+"""Tests for LLM call concurrency limits"""
+
+import asyncio
+
+import pytest
+
+from pulse.services.llm import ConcurrencyLimiter, LLMCapacityError
+
+
+class TestConcurrencyLimiter:
+    """Test the in-flight limit and bounded wait queue"""
+
+    @pytest.mark.asyncio
+    async def test_limits_in_flight_calls(self):
+        """Only max_concurrency callers run at once, the rest wait their turn"""
+        limiter = ConcurrencyLimiter(max_concurrency=2, max_queue=10, queue_timeout=1.0)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(6)))
+
+        assert peak == 2
+        assert limiter.in_flight == 0
+        assert limiter.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_is_full(self):
+        """Callers beyond the wait queue are rejected immediately"""
+        limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=1, queue_timeout=1.0)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(LLMCapacityError):
+            async with limiter.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Waiting longer than queue_timeout raises a capacity error"""
+        limiter = ConcurrencyLimiter(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+
+        async with limiter.slot():
+            with pytest.raises(LLMCapacityError):
+                async with limiter.slot():
+                    pass
+
+        assert limiter.waiting == 0
@@ -6,14 +6,16 @@ import pytest
 
 from pulse.database.session import init_database
 from pulse.services.llm import LLMService
+from pulse.settings import settings
 
 
 class TestLLMServiceMocked:
     """Test LLM service with mocked Anthropic responses"""
 
     @pytest.fixture(autouse=True)
-    async def setup_database(self):
-        """Initialize database for each test"""
+    async def setup_database(self, monkeypatch):
+        """Initialize database for each test, sending every prompt to the (mocked) model"""
+        monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
         await init_database()
 
     @pytest.mark.asyncio
@@ -43,6 +45,7 @@ class TestLLMServiceMocked:
             assert "investor" in result["title"].lower()
 
             # Verify SQL contains JSON functions
+            mock_llm.assert_awaited_once()
             sql = result["sql"].lower()
             assert "json_each" in sql
             assert "top_investors" in sql
@@ -81,6 +84,7 @@ class TestLLMServiceMocked:
             assert result["visualization_type"] == "bar"
 
             # Verify SQL uses JSON functions
+            mock_llm.assert_awaited_once()
             sql = result["sql"].lower()
             assert "json_each" in sql
             assert "product" in sql
@@ -111,6 +115,7 @@ class TestLLMServiceMocked:
             )
 
             # Verify the result
+            mock_llm.assert_awaited_once()
             assert result["success"] is True
             assert result["visualization_type"] == "pie"
             assert "industry" in result["title"].lower()
@@ -240,3 +245,38 @@ class TestLLMServiceMocked:
             assert all(isinstance(prod, str) for prod in products)
 
         conn.close()
+
+
+class TestPromptCaching:
+    """Test that the static system prompt is sent with cache markers"""
+
+    @pytest.mark.asyncio
+    async def test_system_prompt_is_cached_and_usage_recorded(self):
+        from types import SimpleNamespace
+
+        message = SimpleNamespace(
+            content=[SimpleNamespace(text='{"sql": "SELECT 1", "visualization_type": "bar"}')],
+            usage=SimpleNamespace(
+                input_tokens=12,
+                output_tokens=30,
+                cache_read_input_tokens=1400,
+                cache_creation_input_tokens=None,
+            ),
+        )
+
+        llm_service = LLMService()
+        with patch.object(
+            llm_service.client.messages, "create", new_callable=AsyncMock
+        ) as mock_create:
+            mock_create.return_value = message
+            await llm_service._get_llm_response("Show me something")
+            await llm_service._get_llm_response("Show me something else")
+
+        system = mock_create.call_args.kwargs["system"]
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
+        assert system[0]["text"] == llm_service.system_prompt
+        assert mock_create.call_args_list[0].kwargs["system"] is system
+
+        assert llm_service.usage["requests"] == 2
+        assert llm_service.usage["cache_read_input_tokens"] == 2800
+        assert llm_service.usage["cache_creation_input_tokens"] == 0
@@ -0,0 +1,233 @@
+"""Tests for streaming visualization generation"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from pulse.database.session import init_database
+from pulse.main import app
+from pulse.services.llm import LLMService, extract_json_object, find_string_field
+
+
+LLM_JSON = json.dumps(
+    {
+        "sql": "SELECT company_name, g2_rating FROM companies ORDER BY g2_rating DESC LIMIT 3",
+        "visualization_type": "bar",
+        "title": "Top Rated {Companies}",
+        "chart_config": {"x_field": "company_name", "y_field": "g2_rating"},
+    }
+)
+
+
+class FakeStream:
+    """Stand-in for the Anthropic message stream that yields fixed text chunks"""
+
+    def __init__(self, chunks, delay=0):
+        self.chunks = chunks
+        self.delay = delay
+        self.consumed = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def get_final_message(self):
+        return SimpleNamespace(
+            usage=SimpleNamespace(
+                input_tokens=20,
+                output_tokens=80,
+                cache_read_input_tokens=1500,
+                cache_creation_input_tokens=0,
+            )
+        )
+
+    @property
+    async def text_stream(self):
+        for chunk in self.chunks:
+            # Yield to the event loop like a real network read would
+            await asyncio.sleep(self.delay)
+            self.consumed += 1
+            yield chunk
+
+
+def split_chunks(text, size=16):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonParsing:
+    """Test extraction of JSON from model output"""
+
+    def test_extracts_object_with_braces_in_strings(self):
+        text = f"Here you go:\n{LLM_JSON}\nHope that helps {{:}}"
+        assert extract_json_object(text)["title"] == "Top Rated {Companies}"
+
+    def test_rejects_text_without_json(self):
+        with pytest.raises(ValueError, match="Invalid JSON"):
+            extract_json_object("no json here {")
+
+    def test_find_string_field_waits_for_complete_value(self):
+        assert find_string_field('{"sql": "SELECT a FROM', "sql") is None
+        assert find_string_field('{"sql": "SELECT \\"a\\" FROM t", "vis', "sql") == (
+            'SELECT "a" FROM t'
+        )
+
+
+class TestStreamQuery:
+    """Test stage events from LLMService.stream_query"""
+
+    @pytest.fixture(autouse=True)
+    async def setup_database(self):
+        """Initialize database for each test"""
+        await init_database()
+
+    @pytest.mark.asyncio
+    async def test_sql_executes_before_model_finishes(self):
+        stream = FakeStream(split_chunks(LLM_JSON))
+        llm_service = LLMService()
+        started_at_chunk = []
+
+        async def fake_get_data(sql, steps=None):
+            started_at_chunk.append(stream.consumed)
+            return [{"company_name": "Acme", "g2_rating": 4.9}]
+
+        with (
+            patch.object(llm_service.client.messages, "stream", return_value=stream),
+            patch.object(llm_service, "_get_data", side_effect=fake_get_data),
+        ):
+            events = [event async for event in llm_service.stream_query("best rated companies")]
+
+        names = [event["event"] for event in events]
+        assert names == [
+            "started",
+            "model_started",
+            "sql_ready",
+            "sql_validated",
+            "rows",
+            "done",
+        ]
+        assert started_at_chunk[0] < len(stream.chunks)
+        assert events[-1]["title"] == "Top Rated {Companies}"
+        assert events[-1]["row_count"] == 1
+        assert events[4]["rows"] == [{"company_name": "Acme", "g2_rating": 4.9}]
+        assert llm_service.usage["cache_read_input_tokens"] == 1500
+
+    @pytest.mark.asyncio
+    async def test_sql_failing_to_prepare_is_repaired(self):
+        """A speculative query that fails to prepare is repaired, not reported as an error"""
+        bad_json = json.dumps(
+            {
+                "sql": "SELECT company_name, no_such_fn(g2_rating) AS rating FROM companies",
+                "visualization_type": "bar",
+                "title": "Ratings",
+                "chart_config": {"x_field": "company_name", "y_field": "rating"},
+            }
+        )
+        repaired = {
+            **json.loads(LLM_JSON),
+            "sql": "SELECT company_name, g2_rating FROM companies ORDER BY g2_rating DESC LIMIT 3",
+        }
+        # Slow chunks so the speculative query fails while the response is still streaming
+        stream = FakeStream(split_chunks(bad_json), delay=0.02)
+        llm_service = LLMService()
+
+        with (
+            patch.object(llm_service.client.messages, "stream", return_value=stream),
+            patch.object(
+                llm_service, "_get_llm_response", new_callable=AsyncMock, return_value=repaired
+            ) as mock_llm,
+        ):
+            events = [event async for event in llm_service.stream_query("ratings")]
+
+        names = [event["event"] for event in events]
+        assert names == [
+            "started",
+            "model_started",
+            "sql_ready",
+            "sql_validated",
+            "sql_validated",
+            "rows",
+            "done",
+        ]
+        mock_llm.assert_awaited_once()
+        assert events[4]["sql"].startswith(repaired["sql"])
+        assert events[-1]["row_count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_replaced_rows_are_reset(self):
+        """Rows already sent for SQL a repair replaced are followed by a reset event"""
+        stream = FakeStream(split_chunks(LLM_JSON))
+        llm_service = LLMService()
+        queried = []
+
+        async def fake_get_data(sql, steps=None):
+            queried.append(sql)
+            return [{"company_name": f"Company {len(queried)}", "g2_rating": 4.9}]
+
+        async def fake_plan(user_prompt, llm_response):
+            plan = llm_service._build_plan(llm_response)
+            return {**plan, "sql": "SELECT company_name, g2_rating FROM companies"}, None
+
+        with (
+            patch.object(llm_service.client.messages, "stream", return_value=stream),
+            patch.object(llm_service, "_get_data", side_effect=fake_get_data),
+            patch.object(llm_service, "_plan_from_response", side_effect=fake_plan),
+        ):
+            events = [event async for event in llm_service.stream_query("best rated companies")]
+
+        names = [event["event"] for event in events]
+        assert names == [
+            "started",
+            "model_started",
+            "sql_ready",
+            "sql_validated",
+            "rows",
+            "reset",
+            "sql_validated",
+            "rows",
+            "done",
+        ]
+        assert events[7]["offset"] == 0
+        assert events[7]["rows"][0]["company_name"] == "Company 2"
+
+    @pytest.mark.asyncio
+    async def test_invalid_sql_emits_error(self):
+        bad_json = json.dumps({"sql": "DELETE FROM companies", "visualization_type": "bar"})
+        llm_service = LLMService()
+
+        with patch.object(
+            llm_service.client.messages, "stream", return_value=FakeStream(split_chunks(bad_json))
+        ):
+            events = [event async for event in llm_service.stream_query("delete everything")]
+
+        assert events[-1]["event"] == "error"
+        assert events[-1]["success"] is False
+
+    @pytest.mark.asyncio
+    async def test_streaming_endpoint_fast_path(self):
+        with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://test"
+            ) as client:
+                response = await client.post(
+                    "/api/visualizations/generate/stream",
+                    json={"prompt": "Create a pie chart representing industry breakdown"},
+                )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [
+            line.removeprefix("event: ")
+            for line in response.text.splitlines()
+            if line.startswith("event: ")
+        ]
+        assert events[0] == "started"
+        assert "rows" in events
+        assert events[-1] == "done"
+        mock_llm.assert_not_awaited()
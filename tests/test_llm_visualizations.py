@@ -5,6 +5,13 @@ from fastapi.testclient import TestClient
 from httpx import AsyncClient
 
 from pulse.main import app
+from pulse.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def disable_intent_fast_path(monkeypatch):
+    """Send every prompt to the model so these tests exercise SQL generation"""
+    monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
 
 
 class TestLLMVisualizationEndpoints:
@@ -19,6 +26,7 @@ class TestLLMVisualizationEndpoints:
     async def async_client(self):
         """Create async test client"""
         from httpx import ASGITransport
+
         async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
             yield client
 
@@ -68,10 +76,9 @@ class TestLLMVisualizationEndpoints:
         assert data["visualization_type"] == "bar"
         assert "investor" in data["title"].lower()
 
-        # Verify SQL uses JSON functions
+        # Verify SQL uses the investor link table
         sql = data["sql"].lower()
-        assert "json_each" in sql
-        assert "top_investors" in sql
+        assert "company_investors" in sql
 
         # Verify data structure
         assert isinstance(data["data"], list)
@@ -105,9 +112,9 @@ class TestLLMVisualizationEndpoints:
         assert data["success"] is True
         assert data["visualization_type"] in ["bar", "pie"]
 
-        # Verify SQL uses JSON functions for products
+        # Verify SQL uses the product link table
         sql = data["sql"].lower()
-        assert "json_each" in sql
+        assert "company_products" in sql
         assert "product" in sql
 
         # Verify data structure
@@ -181,9 +188,10 @@ class TestLLMVisualizationEndpoints:
         # Verify successful response
         assert data["success"] is True
 
-        # Verify SQL uses JSON functions for filtering
+        # Verify SQL filters through the investor link table
         sql = data["sql"].lower()
-        assert ("json_extract" in sql or "json_each" in sql) and "sequoia" in sql
+        assert "company_investors" in sql
+        assert "sequoia" in sql
 
         # Verify data structure
         assert isinstance(data["data"], list)
@@ -297,8 +305,8 @@ class TestLLMServiceDirectly:
         result = await llm_service.process_query("Which investors appear most frequently?")
 
         assert result["success"] is True
-        assert "json_each" in result["sql"].lower()
-        assert "top_investors" in result["sql"].lower()
+        sql = result["sql"].lower()
+        assert "company_investors" in sql
         assert len(result["data"]) > 0
 
         # Verify data structure
@@ -320,5 +328,5 @@ class TestLLMServiceDirectly:
 
         assert result["success"] is True
         sql_lower = result["sql"].lower()
-        assert "json_each" in sql_lower
+        assert "company_products" in sql_lower
         assert "product" in sql_lower
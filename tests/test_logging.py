@@ -0,0 +1,88 @@
+"""Tests for queued logging and per-logger sampling"""
+
+import json
+import logging
+import queue
+
+import pytest
+import structlog
+
+from pulse import logging as pulse_logging
+from pulse.logging import BoundedQueueHandler, get_logger, sample_by_logger
+from pulse.metrics import log_records_dropped
+from pulse.settings import settings
+
+
+def make_record(msg: str = "message", args: tuple = ()) -> logging.LogRecord:
+    return logging.LogRecord("pulse.test", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_full_queue_drops_and_counts():
+    """Records beyond the queue size are dropped and counted, not blocked on"""
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2))
+    dropped_before = log_records_dropped.snapshot()["samples"]
+
+    for _ in range(5):
+        handler.handle(make_record())
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    total_before = dropped_before[0][1] if dropped_before else 0
+    assert log_records_dropped.snapshot()["samples"][0][1] == total_before + 3
+
+
+def test_prepare_defers_formatting():
+    """Only %-style args are resolved on the caller's thread"""
+    handler = BoundedQueueHandler(queue.Queue())
+
+    handler.handle(make_record("value %s", ("x",)))
+    record = handler.queue.get_nowait()
+
+    assert record.msg == "value x"
+    assert record.args is None
+
+    event_dict = {"event": "structured"}
+    handler.handle(make_record(event_dict))
+    assert handler.queue.get_nowait().msg is event_dict
+
+
+def test_sampling_only_drops_low_levels():
+    """Sampling applies to debug/info events of the configured loggers only"""
+    processor = sample_by_logger({"pulse.request": 0.0, "pulse.kept": 1.0})
+
+    with pytest.raises(structlog.DropEvent):
+        processor(None, "info", {"logger": "pulse.request"})
+
+    assert processor(None, "warning", {"logger": "pulse.request"})
+    assert processor(None, "info", {"logger": "pulse.kept"})
+    assert processor(None, "info", {"logger": "pulse.other"})
+
+
+@pytest.fixture
+def queued_logging(monkeypatch):
+    monkeypatch.setattr(settings, "log_queue_enabled", True)
+    monkeypatch.setattr(settings, "json_logs", True)
+    monkeypatch.setattr(settings, "log_sample_rates", {"pulse.request": 0.0})
+    yield
+    pulse_logging.shutdown_logging()
+    monkeypatch.setattr(settings, "log_queue_enabled", False)
+    pulse_logging.configure_logging()
+
+
+def test_queued_logging_renders_on_listener(queued_logging, capsys):
+    """Structlog and stdlib records are rendered as JSON by the writer thread"""
+    pulse_logging.configure_logging()
+
+    get_logger("pulse.test.queue").info("structured event", answer=42)
+    get_logger("pulse.request").info("sampled away")
+    logging.getLogger("pulse.test.stdlib").warning("plain %s", "record")
+    pulse_logging.shutdown_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    events = {line["event"]: line for line in lines}
+
+    assert events["structured event"]["answer"] == 42
+    assert events["plain record"]["logger"] == "pulse.test.stdlib"
+    assert events["plain record"]["level"] == "warning"
+    assert "sampled away" not in events
+    assert pulse_logging.dropped_log_records() == 0
@@ -0,0 +1,119 @@
+"""Tests for the metrics registry and /metrics endpoint"""
+
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from pulse.main import app
+from pulse.metrics import MetricsRegistry
+
+
+def test_render_counter_gauge_histogram():
+    """Samples render in the Prometheus text format with cumulative buckets"""
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ("route",))
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    latency = registry.histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{route="/a"} 3.0' in text
+    assert "test_in_flight 1.0" in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "test_latency_seconds_sum 5.55" in text
+    assert "test_latency_seconds_count 3" in text
+
+
+def test_labels_are_validated_and_escaped():
+    """Missing labels are rejected and label values are escaped"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test", ("path",))
+
+    with pytest.raises(ValueError):
+        counter.inc()
+
+    counter.inc(path='a"b\\c')
+    assert 'test_total{path="a\\"b\\\\c"} 1.0' in registry.render()
+
+
+def test_register_returns_existing_metric():
+    """Registering the same metric twice returns the original; conflicts are errors"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test")
+
+    assert registry.counter("test_total", "Test") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("test_total", "Test")
+
+
+def test_multiprocess_merge(tmp_path):
+    """Worker snapshots are summed; gauges from exited workers are ignored"""
+    registry = MetricsRegistry()
+    counter = registry.counter("test_total", "Test")
+    gauge = registry.gauge("test_gauge", "Test")
+    counter.inc(2)
+    gauge.set(1)
+
+    # Snapshot left behind by a worker that has exited
+    other = MetricsRegistry()
+    other.counter("test_total", "Test").inc(3)
+    other.gauge("test_gauge", "Test").set(10)
+    (tmp_path / "999999999.json").write_text(
+        json.dumps({"pid": 999999999, "metrics": other.snapshot()})
+    )
+
+    text = registry.render(str(tmp_path))
+
+    assert "test_total 5.0" in text
+    assert "test_gauge 1.0" in text
+
+
+def test_metrics_endpoint_labels_route_templates():
+    """Request latency is labelled with the route template, not the raw path"""
+    with TestClient(app) as client:
+        client.get("/api/companies/1")
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/companies/{company_id}"' in response.text
+    assert '/api/companies/1"' not in response.text
+    assert "pulse_db_session_acquire_seconds_count" in response.text
+
+
+def test_retired_snapshots_keep_counters(tmp_path):
+    """Exited, stalled and earlier same-pid workers keep their counters but not gauges"""
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests")
+    in_flight = registry.gauge("test_in_flight", "In flight")
+    requests.inc(3)
+    in_flight.set(2)
+    snapshot = registry.snapshot()
+    for pid, started in [(999999999, 0), (os.getppid(), 0), (os.getpid(), -1)]:
+        path = tmp_path / f"{pid}.json"
+        path.write_text(json.dumps({"pid": pid, "started": started, "metrics": snapshot}))
+    os.utime(tmp_path / f"{os.getppid()}.json", (0, 0))
+
+    registry.retire_snapshots(str(tmp_path), max_age=60)
+    registry.retire_snapshots(str(tmp_path), max_age=60)
+
+    names = [file.name for file in tmp_path.glob("*.json")]
+    assert len(names) == 3
+    assert all(name.startswith("retired-") for name in names)
+
+    text = registry.render(str(tmp_path))
+    assert "test_requests_total 12.0" in text
+    assert "test_in_flight 2.0" in text
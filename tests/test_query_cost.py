@@ -0,0 +1,166 @@
+"""Tests for the query-plan cost guard on generated SQL"""
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pulse.database.session import init_database
+from pulse.services.llm import LLMService, SQLBudgetError
+from pulse.services.query_cost import PlanStep, estimate_cost
+from pulse.services.sql_validator import table_aliases, with_limit
+from pulse.settings import settings
+
+
+TABLE_ROWS = {"companies": 1000, "company_investors": 5000, "investors": 200}
+
+
+def test_nested_loops_multiply():
+    """Each loop level visits its rows once per row of the enclosing loops"""
+    steps = [
+        PlanStep(2, 0, "SCAN company_investors"),
+        PlanStep(4, 0, "SEARCH investors USING INTEGER PRIMARY KEY (rowid=?)"),
+        PlanStep(8, 0, "SEARCH c USING INDEX ix_companies_industry (industry=?)"),
+    ]
+
+    cost = estimate_cost(steps, TABLE_ROWS, {"c": "companies"})
+
+    # 5000 scanned, 5000 primary key lookups, 10 rows per industry lookup
+    assert cost.rows == 5000 + 5000 + 50_000
+    assert cost.full_scans == ["company_investors"]
+
+
+def test_sorts_and_correlated_subqueries_add_cost():
+    """Temp B-trees and per-row subqueries are counted and priced"""
+    steps = [
+        PlanStep(2, 0, "SCAN companies"),
+        PlanStep(6, 0, "CORRELATED SCALAR SUBQUERY 1"),
+        PlanStep(9, 6, "SCAN company_investors"),
+        PlanStep(20, 0, "USE TEMP B-TREE FOR ORDER BY"),
+    ]
+
+    cost = estimate_cost(steps, TABLE_ROWS)
+
+    assert cost.correlated_subqueries == 1
+    assert cost.temp_btrees == 1
+    assert cost.rows > 1000 * 5000
+
+
+def test_aliases_and_limits():
+    """Plan names resolve through aliases; LIMIT is only added at the top level"""
+    sql = "SELECT c.id FROM companies AS c JOIN company_investors ci ON ci.company_id = c.id"
+
+    assert table_aliases(sql, set(TABLE_ROWS))["c"] == "companies"
+    assert table_aliases(sql, set(TABLE_ROWS))["ci"] == "company_investors"
+    assert with_limit("SELECT id FROM companies;", 6) == "SELECT id FROM companies LIMIT 6"
+    assert (
+        with_limit("SELECT id FROM companies -- newest first", 6)
+        == "SELECT id FROM companies LIMIT 6"
+    )
+    assert (
+        with_limit("SELECT id FROM companies; /* done */", 6) == "SELECT id FROM companies LIMIT 6"
+    )
+    assert with_limit("SELECT id FROM companies LIMIT 3", 6) == "SELECT id FROM companies LIMIT 3"
+    assert with_limit("SELECT id FROM (SELECT id FROM companies LIMIT 3)", 6).endswith("LIMIT 6")
+
+
+@pytest.fixture
+async def service():
+    await init_database()
+    return LLMService()
+
+
+async def test_table_rows_match_table_sizes(service):
+    """Table sizes come from statistics or counts and cover every readable table"""
+    rows = await service._table_rows()
+    counts = await service._execute_sql("SELECT count(*) AS n FROM companies")
+
+    assert set(rows) == set(service.sql_validator.tables)
+    assert rows["companies"] == counts[0]["n"]
+
+
+async def test_expensive_query_rejected(service, monkeypatch):
+    """Queries estimated above the reject threshold never run"""
+    monkeypatch.setattr(settings, "sql_cost_reject_rows", 1000)
+
+    with pytest.raises(SQLBudgetError, match="would read about"):
+        await service._execute_sql(
+            "SELECT a.id FROM companies a, companies b, company_investors ci"
+        )
+
+
+async def test_limit_added_above_threshold(service, monkeypatch):
+    """Queries above the limit threshold run with a LIMIT just past the row cap"""
+    monkeypatch.setattr(settings, "sql_cost_limit_rows", 0)
+    monkeypatch.setattr(settings, "sql_max_rows", 5)
+    executed = []
+    run_sql = service._run_sql
+
+    async def record(sql):
+        executed.append(sql)
+        return await run_sql(sql)
+
+    monkeypatch.setattr(service, "_run_sql", record)
+    data = await service._execute_sql("SELECT id FROM companies ORDER BY valuation_usd DESC")
+
+    assert executed == ["SELECT id FROM companies ORDER BY valuation_usd DESC LIMIT 6"]
+    assert len(data) == 5
+    assert data.truncated is True
+
+
+async def test_heavy_queries_share_limited_slots(monkeypatch):
+    """Heavy queries run at most sql_heavy_concurrency at a time"""
+    monkeypatch.setattr(settings, "sql_cost_heavy_rows", 0)
+    monkeypatch.setattr(settings, "sql_heavy_concurrency", 1)
+    await init_database()
+    service = LLMService()
+    running = 0
+    peak = 0
+
+    async def slow_run(sql):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return []
+
+    monkeypatch.setattr(service, "_run_sql", slow_run)
+    await asyncio.gather(*(service._execute_sql("SELECT id FROM companies") for _ in range(3)))
+
+    assert peak == 1
+
+
+async def test_slow_queries_logged_with_plan(service, monkeypatch, caplog):
+    """Queries slower than the threshold are logged with their plan and estimate"""
+    monkeypatch.setattr(settings, "sql_slow_query_seconds", 0)
+
+    with caplog.at_level(logging.WARNING, logger="pulse.llm"):
+        await service._execute_sql("SELECT id FROM companies")
+
+    record = next(r for r in caplog.records if r.getMessage() == "Slow query")
+    assert record.plan
+    assert record.estimated_rows > 0
+
+
+async def test_model_sql_is_prepared_once(service, monkeypatch):
+    """The plan prepared while validating the model's SQL is reused by the cost guard"""
+    monkeypatch.setattr(settings, "intent_fast_path_enabled", False)
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+    answer = {
+        "sql": "SELECT company_name FROM companies ORDER BY g2_rating DESC LIMIT 3",
+        "visualization_type": "bar",
+        "title": "Top Rated",
+        "chart_config": {},
+    }
+
+    with (
+        patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+        patch.object(LLMService, "_query_plan", wraps=service._query_plan) as query_plan,
+    ):
+        mock_llm.return_value = answer
+        result = await service.process_query("best rated companies")
+
+    assert result["success"] is True
+    assert query_plan.await_count == 1
@@ -0,0 +1,69 @@
+"""Tests for the request context (request id + timing) middleware"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from pulse.middleware.request_context import RequestContextMiddleware, request_id_var
+
+
+def make_client(trust_request_id_header: bool = False) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware, trust_request_id_header=trust_request_id_header)
+
+    @app.get("/ids")
+    async def ids(request: Request):
+        return {"state": request.state.request_id, "context": request_id_var.get()}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_headers_and_request_id():
+    """Every response carries the request id the handler saw, plus the process time"""
+    response = make_client().get("/ids")
+
+    assert response.status_code == 200
+    request_id = response.headers["X-Request-ID"]
+    assert response.json() == {"state": request_id, "context": request_id}
+    assert float(response.headers["X-Process-Time"]) >= 0
+    assert request_id_var.get() is None
+
+
+def test_streaming_response_passes_through():
+    """Streaming bodies arrive intact with the headers applied"""
+    response = make_client().get("/stream")
+
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    assert "X-Request-ID" in response.headers
+    assert "X-Process-Time" in response.headers
+
+
+def test_not_found_still_gets_headers():
+    """Headers are added to responses the router produces itself"""
+    response = make_client().get("/missing")
+    assert response.status_code == 404
+    assert "X-Request-ID" in response.headers
+
+
+@pytest.mark.parametrize(
+    ("trust", "inbound", "kept"),
+    [
+        (False, "abc-123", False),
+        (True, "abc-123", True),
+        (True, "bad id\nwith newline", False),
+        (True, "x" * 200, False),
+    ],
+)
+def test_inbound_request_id(trust, inbound, kept):
+    """Inbound ids are only reused when trusted and well-formed"""
+    response = make_client(trust).get("/ids", headers={"X-Request-ID": inbound})
+    assert (response.headers["X-Request-ID"] == inbound) is kept
@@ -0,0 +1,75 @@
+"""Tests for request-scoped stage timings and the Server-Timing header"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from pulse import server_timing
+from pulse.main import app
+from pulse.middleware.request_context import RequestContextMiddleware
+from pulse.settings import settings
+
+
+def test_record_outside_request_is_noop():
+    """Stages timed outside a request are ignored"""
+    server_timing.record("llm", 1.0)
+    assert server_timing.current() == {}
+
+
+def test_timings_accumulate_and_format():
+    """Repeated stages add up and format as a Server-Timing value"""
+    token = server_timing.start_request()
+    try:
+        server_timing.record("sanitize", 0.001)
+        server_timing.record("sanitize", 0.002)
+        server_timing.record("sql", 0.0125)
+        timings = server_timing.current()
+    finally:
+        server_timing.end_request(token)
+
+    assert timings == {"sanitize": 3.0, "sql": 12.5}
+    assert server_timing.header_value(timings) == "sanitize;dur=3.00, sql;dur=12.50"
+
+
+def test_header_only_when_stages_recorded():
+    """The middleware adds Server-Timing only for requests that timed a stage"""
+    test_app = FastAPI()
+    test_app.add_middleware(RequestContextMiddleware)
+
+    @test_app.get("/timed")
+    async def timed():
+        with server_timing.timed("work"):
+            pass
+        return {}
+
+    @test_app.get("/plain")
+    async def plain():
+        return {}
+
+    client = TestClient(test_app)
+    assert client.get("/timed").headers["Server-Timing"].startswith("work;dur=")
+    assert "Server-Timing" not in client.get("/plain").headers
+
+
+@pytest.mark.parametrize("debug", [True, False])
+def test_generate_reports_stage_timings(monkeypatch, debug):
+    """Visualization responses break down sanitize/sql/serialize; the body only in debug"""
+    monkeypatch.setattr(settings, "debug", debug)
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/visualizations/generate",
+            json={"prompt": "Which investors appear most frequently?"},
+        )
+
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")]
+    assert {"sanitize", "sql", "serialize"} <= set(stages)
+
+    body = response.json()
+    assert body["success"] is True
+    if debug:
+        assert {"sanitize", "sql"} <= set(body["timings"])
+    else:
+        assert body["timings"] is None
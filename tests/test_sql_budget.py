@@ -0,0 +1,74 @@
+"""Tests for the execution budget applied to generated SQL"""
+
+import pytest
+
+from pulse.database.session import init_database
+from pulse.services.llm import SQLBudgetError, _build_result, llm_service
+from pulse.settings import settings
+
+
+RUNAWAY_SQL = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) AS n FROM c"
+)
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    await init_database()
+
+
+async def test_row_cap_truncates(monkeypatch):
+    """Rows past the cap are dropped and the result is flagged truncated"""
+    monkeypatch.setattr(settings, "sql_max_rows", 3)
+
+    data = await llm_service._execute_sql("SELECT id FROM companies ORDER BY id")
+
+    assert len(data) == 3
+    assert data.truncated is True
+    assert _build_result(
+        {"visualization_type": "table", "title": "", "sql": "", "chart_config": {}}, data
+    )["truncated"]
+
+
+async def test_results_under_cap_are_not_truncated(monkeypatch):
+    """A result that fits within the cap is returned whole"""
+    monkeypatch.setattr(settings, "sql_max_rows", 100)
+
+    data = await llm_service._execute_sql("SELECT id FROM companies ORDER BY id LIMIT 5")
+
+    assert [row["id"] for row in data] == sorted(row["id"] for row in data)
+    assert len(data) == 5
+    assert data.truncated is False
+
+
+async def test_step_limit_interrupts_runaway_query(monkeypatch):
+    """A query past the VM-step limit is interrupted with a budget error"""
+    monkeypatch.setattr(settings, "sql_timeout_seconds", 0)
+    monkeypatch.setattr(settings, "sql_max_vm_steps", 100_000)
+
+    with pytest.raises(SQLBudgetError, match="steps"):
+        await llm_service._execute_sql(RUNAWAY_SQL)
+
+
+async def test_timeout_interrupts_runaway_query(monkeypatch):
+    """A query past the wall-clock limit is interrupted with a budget error"""
+    monkeypatch.setattr(settings, "sql_timeout_seconds", 0.05)
+    monkeypatch.setattr(settings, "sql_max_vm_steps", 0)
+
+    with pytest.raises(SQLBudgetError, match=r"0\.05s"):
+        await llm_service._execute_sql(RUNAWAY_SQL)
+
+
+async def test_handler_is_cleared_after_interrupt(monkeypatch):
+    """Pooled connections do not keep the budget of an interrupted query"""
+    monkeypatch.setattr(settings, "sql_max_vm_steps", 100_000)
+    with pytest.raises(SQLBudgetError):
+        await llm_service._execute_sql(RUNAWAY_SQL)
+
+    monkeypatch.setattr(settings, "sql_timeout_seconds", 0)
+    monkeypatch.setattr(settings, "sql_max_vm_steps", 0)
+    data = await llm_service._execute_sql(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 200000) "
+        "SELECT count(*) AS n FROM c"
+    )
+    assert data == [{"n": 200000}]
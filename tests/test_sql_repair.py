@@ -0,0 +1,121 @@
+"""Tests for preparing generated SQL with EXPLAIN and repairing it with the model"""
+
+import json
+import sqlite3
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from pulse.database.session import init_database
+from pulse.metrics import llm_sql_repairs
+from pulse.services.llm import LLMService
+from pulse.settings import settings
+
+
+GOOD_SQL = "SELECT company_name, g2_rating FROM companies ORDER BY g2_rating DESC LIMIT 3"
+
+
+def model_answer(sql: str) -> dict:
+    return {
+        "sql": sql,
+        "visualization_type": "bar",
+        "title": "Top Rated",
+        "chart_config": {"x_field": "company_name", "y_field": "g2_rating"},
+    }
+
+
+def repairs(outcome: str) -> float:
+    samples = {tuple(labels): value for labels, value in llm_sql_repairs.snapshot()["samples"]}
+    return samples.get((outcome,), 0.0)
+
+
+@pytest.fixture(autouse=True)
+async def database(monkeypatch):
+    monkeypatch.setattr(settings, "result_cache_enabled", False)
+    monkeypatch.setattr(settings, "plan_cache_enabled", False)
+    await init_database()
+
+
+async def test_explain_returns_plan_without_running():
+    """EXPLAIN QUERY PLAN prepares the statement and reports its plan steps"""
+    plan = await LLMService()._query_plan("SELECT company_name FROM companies WHERE id = 1")
+
+    assert plan
+    assert any("companies" in step.detail for step in plan)
+
+
+@pytest.mark.parametrize(
+    ("bad_sql", "error"),
+    [
+        # Caught by the validator
+        ("SELECT company_name, rating FROM companies", "unknown column 'rating'"),
+        # Only SQLite can tell the function does not exist
+        ("SELECT json_length(top_investors) AS n FROM companies", "no such function"),
+    ],
+)
+async def test_failed_sql_is_repaired_by_follow_up_turn(bad_sql, error):
+    """The error goes back to the model once and its fixed SQL is used"""
+    service = LLMService()
+    repaired_before = repairs("repaired")
+
+    with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.side_effect = [model_answer(bad_sql), model_answer(GOOD_SQL)]
+        result = await service.process_query("best rated companies")
+
+    assert result["success"] is True
+    assert result["sql"] == GOOD_SQL
+    assert len(result["data"]) == 3
+    assert mock_llm.call_count == 2
+
+    messages = mock_llm.call_args.kwargs["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    assert json.loads(messages[1]["content"])["sql"] == bad_sql
+    assert error in messages[2]["content"]
+    assert repairs("repaired") == repaired_before + 1
+
+
+async def test_repair_attempts_are_bounded(monkeypatch):
+    """SQL that keeps failing gives up after the configured number of repairs"""
+    monkeypatch.setattr(settings, "sql_repair_attempts", 2)
+    service = LLMService()
+    failed_before = repairs("failed")
+
+    with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = model_answer("SELECT nope FROM companies")
+        result = await service.process_query("best rated companies")
+
+    assert result["success"] is False
+    assert "unknown column 'nope'" in result["error"]
+    assert mock_llm.call_count == 3
+    assert repairs("failed") == failed_before + 1
+
+
+async def test_writes_are_not_sent_for_repair():
+    """Rejected writes fail immediately instead of asking the model again"""
+    service = LLMService()
+
+    with patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = model_answer("DELETE FROM companies")
+        result = await service.process_query("remove everything")
+
+    assert result["success"] is False
+    assert mock_llm.call_count == 1
+
+
+@pytest.mark.parametrize("message", ["database is locked", "disk I/O error", "not authorized"])
+async def test_environment_errors_are_not_sent_for_repair(message):
+    """Database errors the SQL can't fix are raised without a repair turn"""
+    service = LLMService()
+    error = OperationalError("EXPLAIN QUERY PLAN ...", {}, sqlite3.OperationalError(message))
+
+    with (
+        patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+        patch.object(LLMService, "_query_plan", new_callable=AsyncMock, side_effect=error),
+    ):
+        mock_llm.return_value = model_answer(GOOD_SQL)
+        result = await service.process_query("best rated companies")
+
+    assert result["success"] is False
+    assert message in result["error"]
+    assert mock_llm.call_count == 1
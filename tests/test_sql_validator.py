@@ -0,0 +1,96 @@
+"""Tests for tokenizer-based validation of generated SQL"""
+
+import pytest
+
+from pulse.services.intents import DEFAULT_INTENTS
+from pulse.services.llm import llm_service
+from pulse.services.sql_validator import SQLValidator, tokenize
+
+
+@pytest.fixture
+def validator():
+    return SQLValidator(
+        {
+            "companies": {"id", "company_name", "industry", "top_investors", "updated_at"},
+            "company_investors": {"company_id", "investor_id"},
+            "investors": {"id", "name"},
+        }
+    )
+
+
+def test_tokenize_keeps_strings_and_drops_comments():
+    """Strings and quoted names are single tokens; comments are dropped"""
+    tokens = tokenize("SELECT 'a -- b', \"x y\" /* note */ FROM t -- trailing")
+
+    assert [(t.kind, t.value) for t in tokens] == [
+        ("name", "SELECT"),
+        ("string", "'a -- b'"),
+        ("op", ","),
+        ("quoted", '"x y"'),
+        ("name", "FROM"),
+        ("name", "t"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT company_name, updated_at FROM companies ORDER BY updated_at DESC",
+        "SELECT industry, COUNT(*) AS count FROM companies GROUP BY industry ORDER BY count DESC;",
+        "SELECT company_name FROM companies WHERE company_name LIKE '%drop%; delete --%'",
+        "SELECT replace(company_name, 'Inc', '') name FROM companies",
+        "SELECT c.company_name, i.name FROM companies c "
+        "JOIN company_investors ci ON ci.company_id = c.id "
+        "JOIN investors AS i ON i.id = ci.investor_id",
+        "SELECT je.value AS investor, COUNT(*) n FROM companies, "
+        "json_each(companies.top_investors) je GROUP BY je.value ORDER BY n DESC",
+        "WITH counts(industry, n) AS (SELECT industry, COUNT(*) FROM companies GROUP BY industry) "
+        "SELECT industry, n FROM counts WHERE n > 1",
+        "SELECT t.industry FROM (SELECT industry FROM companies) AS t",
+    ],
+)
+def test_allows_reads_of_known_schema(validator, sql):
+    """Reads of known tables pass, including ones previous substring checks rejected"""
+    assert validator.validate(f"  {sql}\n") == sql
+
+
+@pytest.mark.parametrize(
+    ("sql", "error"),
+    [
+        ("DELETE FROM companies", "must start with 'SELECT' or 'WITH'"),
+        ("SELECT 1; DROP TABLE companies", "single statement"),
+        ("SELECT * INTO backup FROM companies", "'INTO' not allowed"),
+        ("SELECT * FROM users", "unknown table 'users'"),
+        ("SELECT * FROM sqlite_master", "unknown table 'sqlite_master'"),
+        ("SELECT * FROM main.companies", "schema-qualified"),
+        ("SELECT * FROM pragma_table_info('companies')", "table function"),
+        ("SELECT password FROM companies", "unknown column 'password'"),
+        ("SELECT companies.nope FROM companies", "unknown column 'companies.nope'"),
+        ("SELECT x.id FROM companies", "unknown table or alias 'x'"),
+        ("SELECT COUNT(*) FROM companies WHERE (id > 1", "unbalanced"),
+        ("SELECT 'unterminated FROM companies", "unexpected character"),
+    ],
+)
+def test_rejects_writes_and_unknown_references(validator, sql, error):
+    """Anything but a single read of known tables and columns is rejected"""
+    with pytest.raises(ValueError, match="SQL validation failed") as exc_info:
+        validator.validate(sql)
+    assert error in str(exc_info.value)
+
+
+def test_results_cached_per_normalized_query(validator):
+    """Whitespace variants of a query share one cache entry, rejections included"""
+    validator.validate("SELECT id FROM companies")
+    validator.validate("SELECT   id\n  FROM companies")
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            validator.validate("SELECT secret FROM companies")
+
+    info = validator.cache_info()
+    assert (info.hits, info.misses) == (2, 2)
+
+
+@pytest.mark.parametrize("intent", DEFAULT_INTENTS, ids=lambda intent: intent.name)
+def test_service_accepts_intent_sql(intent):
+    """The vetted intent SQL passes validation against the service schema"""
+    assert llm_service._sanitize_sql(intent.sql)
@@ -0,0 +1,127 @@
+"""Tests for style-only visualization modifications"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from pulse.main import app
+from pulse.services.llm import LLMService
+from pulse.services.styling import parse_style_instruction
+
+
+EXISTING_VISUALIZATION = {
+    "visualization_type": "bar",
+    "title": "Most Frequent Investors",
+    "sql": "SELECT json_each.value as investor, COUNT(*) as frequency "
+    "FROM companies, json_each(top_investors) GROUP BY investor",
+    "data": [{"investor": "Sequoia", "frequency": 18}],
+    "chart_config": {"x_field": "investor", "y_field": "frequency", "legend_position": "bottom"},
+}
+
+
+class TestParseStyleInstruction:
+    """Test the local styling vocabulary"""
+
+    @pytest.mark.parametrize(
+        ("instruction", "expected"),
+        [
+            (
+                "Change the color of the chart to light blue",
+                {"colors": ["#87CEEB"], "chart_style": ""},
+            ),
+            ("Make the bars red and green", {"colors": ["#FF6384", "#4BC0C0"], "chart_style": ""}),
+            ("Use pastel colors", {"chart_style": "pastel", "colors": []}),
+            ("Apply vibrant theme", {"chart_style": "vibrant", "colors": []}),
+            ("Make the title bold", {"title_style": "bold"}),
+            ("Make the header row of the table bold", {"font_weight": "bold"}),
+            ("Move the legend to the left", {"legend_position": "left"}),
+            ("Set font size to 16px", {"font_size": "16px"}),
+            ("Make the background #ffb6c1", {"background_color": "#FFB6C1"}),
+            ("Use multi-colored bars", {"chart_style": "", "colors": []}),
+        ],
+    )
+    def test_parses_known_vocabulary(self, instruction, expected):
+        assert parse_style_instruction(instruction, "bar") == expected
+
+    @pytest.mark.parametrize(
+        "instruction",
+        [
+            "Make it blue and only show the top 5",
+            "Turn it into a line chart",
+            "Make it look nicer",
+            "Move it to the top",
+            "Make the title red",
+            "Make the legend blue",
+            "Use #ff0000 for the border",
+            "Make it blue with font size 20",
+            "Make the title bold and italic",
+            "Move the legend to the left and right",
+            "Set font size to 12px and make it larger",
+        ],
+    )
+    def test_returns_none_for_unknown_instructions(self, instruction):
+        assert parse_style_instruction(instruction, "bar") is None
+
+
+class TestModifyEndpoint:
+    """Test /api/visualizations/modify"""
+
+    @pytest.fixture
+    async def async_client(self):
+        """Create async test client"""
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+    @pytest.mark.asyncio
+    async def test_styling_skips_llm_and_database(self, async_client):
+        with (
+            patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            response = await async_client.post(
+                "/api/visualizations/modify",
+                json={
+                    "prompt": "Make it light blue",
+                    "existing_visualization": EXISTING_VISUALIZATION,
+                },
+            )
+
+            data = response.json()
+            assert data["success"] is True
+            assert data["chart_config"]["colors"] == ["#87CEEB"]
+            assert data["chart_config"]["x_field"] == "investor"
+            assert data["data"] == EXISTING_VISUALIZATION["data"]
+            assert data["sql"] == EXISTING_VISUALIZATION["sql"]
+            mock_llm.assert_not_awaited()
+            mock_execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_unknown_instruction_reuses_existing_data(self, async_client):
+        with (
+            patch.object(LLMService, "_get_llm_response", new_callable=AsyncMock) as mock_llm,
+            patch.object(LLMService, "_execute_sql", new_callable=AsyncMock) as mock_execute,
+        ):
+            mock_llm.return_value = {
+                "sql": "SELECT 1",
+                "visualization_type": "bar",
+                "title": "Investors, Ranked",
+                "chart_config": {"chart_style": "pastel"},
+            }
+
+            response = await async_client.post(
+                "/api/visualizations/modify",
+                json={
+                    "prompt": "Make it look more professional",
+                    "existing_visualization": EXISTING_VISUALIZATION,
+                },
+            )
+
+            data = response.json()
+            assert data["success"] is True
+            assert data["title"] == "Investors, Ranked"
+            assert data["chart_config"]["chart_style"] == "pastel"
+            assert data["sql"] == EXISTING_VISUALIZATION["sql"]
+            assert data["data"] == EXISTING_VISUALIZATION["data"]
+            mock_llm.assert_awaited_once()
+            mock_execute.assert_not_awaited()